@@ -0,0 +1,48 @@
+"""Compare two benchmark result files and flag throughput regressions.
+
+Usage: python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+Exits with status 1 if any stage got slower than the threshold (percent).
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed slowdown in percent before a stage counts as a regression')
+    args = parser.parse_args()
+    old, new = load(args.baseline), load(args.candidate)
+    if old.get('params') != new.get('params'):
+        print("Warning: the runs used different corpus parameters; numbers may not be comparable.")
+    print(f"baseline  {old.get('revision')}\ncandidate {new.get('revision')}\n")
+    regressions = 0
+    for profile, stages in new['results'].items():
+        for stage, entry in stages.items():
+            before = old['results'].get(profile, {}).get(stage)
+            if not before or not before.get('seconds') or not entry.get('seconds'):
+                continue
+            # Compare time per file so runs with different corpus sizes still line up
+            old_per_file = before['seconds'] / max(1, before['files'])
+            new_per_file = entry['seconds'] / max(1, entry['files'])
+            change = (new_per_file - old_per_file) / old_per_file * 100
+            flag = ''
+            if change > args.threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(f"{profile:9s} {stage:12s} {old_per_file * 1000:10.3f} ms -> {new_per_file * 1000:10.3f} ms  {change:+7.1f}%{flag}")
+    old_rss, new_rss = old.get('peak_rss_bytes'), new.get('peak_rss_bytes')
+    if old_rss and new_rss:
+        print(f"\npeak RSS {old_rss / 1e6:.1f} MB -> {new_rss / 1e6:.1f} MB")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
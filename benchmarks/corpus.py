@@ -0,0 +1,132 @@
+"""Deterministic synthetic PDF corpora for the benchmark suite.
+
+Every corpus is derived from a seed, so the same seed and scale always
+produce byte-identical files and results stay comparable between commits.
+"""
+import os
+import random
+import zlib
+from typing import Any, Dict
+
+import pikepdf
+
+PROFILES = ('tiny', 'huge', 'deep', 'metadata')
+
+
+def _new_pdf(rng: random.Random, pages: int = 1) -> pikepdf.Pdf:
+    pdf = pikepdf.new()
+    for _ in range(pages):
+        pdf.add_blank_page()
+        ops = b"".join(b"%d %d m %d %d l S\n" % (rng.randrange(612), rng.randrange(792), rng.randrange(612), rng.randrange(792)) for _ in range(50))
+        pdf.pages[-1].Contents = pdf.make_stream(ops)
+    pdf.docinfo['/Author'] = f"Author {rng.randrange(10 ** 6)}"
+    pdf.docinfo['/Title'] = f"Document {rng.randrange(10 ** 6)}"
+    pdf.docinfo['/Producer'] = "benchmark corpus"
+    return pdf
+
+
+def _save(pdf: pikepdf.Pdf, path: str) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # static_id keeps /ID fixed so output is byte-identical for a given seed
+    pdf.save(path, static_id=True)
+    return os.path.getsize(path)
+
+
+def _add_image_page(pdf: pikepdf.Pdf, rng: random.Random, side: int, compressible: bool) -> None:
+    if compressible:
+        row = bytes(rng.randrange(256) for _ in range(side * 3))
+        raw = row * side
+        image = pdf.make_stream(zlib.compress(raw, 1), Filter=pikepdf.Name.FlateDecode)
+    else:
+        # Random bytes stand in for already-compressed scans
+        image = pdf.make_stream(rng.randbytes(side * side * 3))
+    image.Type = pikepdf.Name.XObject
+    image.Subtype = pikepdf.Name.Image
+    image.Width = side
+    image.Height = side
+    image.ColorSpace = pikepdf.Name.DeviceRGB
+    image.BitsPerComponent = 8
+    pdf.add_blank_page()
+    page = pdf.pages[-1]
+    page.Resources = pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=image))
+    page.Contents = pdf.make_stream(b"q 612 0 0 792 0 0 cm /Im0 Do Q")
+
+
+def generate_tiny(root: str, rng: random.Random, scale: float) -> Dict[str, Any]:
+    count = max(1, int(500 * scale))
+    total = 0
+    for i in range(count):
+        total += _save(_new_pdf(rng), os.path.join(root, 'tiny', f"tiny_{i:05d}.pdf"))
+    return {'files': count, 'bytes': total}
+
+
+def generate_huge(root: str, rng: random.Random, scale: float) -> Dict[str, Any]:
+    count = max(1, int(3 * scale))
+    pages = max(1, int(10 * scale))
+    total = 0
+    for i in range(count):
+        pdf = _new_pdf(rng, pages=0)
+        for p in range(pages):
+            _add_image_page(pdf, rng, 512, compressible=p % 2 == 0)
+        total += _save(pdf, os.path.join(root, 'huge', f"huge_{i:03d}.pdf"))
+    return {'files': count, 'bytes': total}
+
+
+def generate_deep(root: str, rng: random.Random, scale: float) -> Dict[str, Any]:
+    depth = max(2, int(8 * scale))
+    fanout = 2
+    count = 0
+    total = 0
+    level = [os.path.join(root, 'deep')]
+    for d in range(depth):
+        next_level = []
+        for directory in level:
+            total += _save(_new_pdf(rng), os.path.join(directory, f"level_{d}.pdf"))
+            count += 1
+            next_level.extend(os.path.join(directory, f"d{k}") for k in range(fanout))
+        level = next_level
+    return {'files': count, 'bytes': total, 'depth': depth}
+
+
+def generate_metadata(root: str, rng: random.Random, scale: float) -> Dict[str, Any]:
+    count = max(1, int(50 * scale))
+    total = 0
+    for i in range(count):
+        pdf = _new_pdf(rng)
+        for k in range(200):
+            pdf.docinfo[f'/Custom{k}'] = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz ') for _ in range(200))
+        with pdf.open_metadata(set_pikepdf_as_editor=False) as meta:
+            meta['dc:description'] = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz ') for _ in range(20000))
+            meta['dc:creator'] = [f"Creator {k}" for k in range(50)]
+        total += _save(pdf, os.path.join(root, 'metadata', f"meta_{i:04d}.pdf"))
+    return {'files': count, 'bytes': total}
+
+
+GENERATORS = {
+    'tiny': generate_tiny,
+    'huge': generate_huge,
+    'deep': generate_deep,
+    'metadata': generate_metadata,
+}
+
+
+def generate_corpus(root: str, profiles=PROFILES, scale: float = 1.0, seed: int = 0) -> Dict[str, Any]:
+    """Generate the requested corpus profiles under root and return a summary per profile."""
+    summary = {}
+    for profile in profiles:
+        # Separate stream per profile so adding a profile does not change the others
+        rng = random.Random(f"{seed}:{profile}")
+        summary[profile] = GENERATORS[profile](root, rng, scale)
+    return summary
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic PDF corpus")
+    parser.add_argument('root', help='Directory to generate the corpus in')
+    parser.add_argument('--profiles', nargs='*', choices=PROFILES, default=list(PROFILES))
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for file counts and sizes')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(generate_corpus(args.root, args.profiles, args.scale, args.seed), indent=2))
@@ -0,0 +1,154 @@
+"""Time the processing stages over a synthetic corpus and write machine-readable results.
+
+Usage (from the project root):
+    python -m benchmarks.run --output results.json [--scale 0.2] [--profiles tiny huge]
+    python -m benchmarks.compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import pikepdf
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.corpus import PROFILES, generate_corpus  # noqa: E402
+from src.memory import max_rss  # noqa: E402
+from src.plan import MetadataPlan  # noqa: E402
+from src.processing import PDFProcessor  # noqa: E402
+from src.scanner import iter_pdf_files  # noqa: E402
+
+METADATA_PLAN = MetadataPlan.from_dict({'remove': ['/Author', '/Producer'], 'set': {'/Title': 'Document'}})
+
+
+def git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, stage: str, seconds: float, files: int = 1, nbytes: int = 0) -> None:
+        entry = self.stages.setdefault(stage, {'seconds': 0.0, 'files': 0, 'bytes': 0})
+        entry['seconds'] += seconds
+        entry['files'] += files
+        entry['bytes'] += nbytes
+
+    def time(self, stage: str, func: Callable[[], Any], nbytes: int = 0) -> Any:
+        start = time.perf_counter()
+        result = func()
+        self.add(stage, time.perf_counter() - start, 1, nbytes)
+        return result
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for stage, entry in self.stages.items():
+            seconds = entry['seconds']
+            out[stage] = {
+                **entry,
+                'files_per_s': entry['files'] / seconds if seconds else None,
+                'mb_per_s': entry['bytes'] / 1e6 / seconds if seconds and entry['bytes'] else None,
+            }
+        return out
+
+
+def bench_profile(profile_dir: str, scratch_dir: str, compression: str) -> Dict[str, Any]:
+    timer = StageTimer()
+    processor = PDFProcessor({})
+
+    start = time.perf_counter()
+    files: List[str] = list(iter_pdf_files([profile_dir], recursive=True, max_depth=0))
+    timer.add('scan', time.perf_counter() - start, len(files))
+    sizes = {f: os.path.getsize(f) for f in files}
+
+    for i, f in enumerate(files):
+        out_path = os.path.join(scratch_dir, f"out_{i}.pdf")
+        pdf = timer.time('open', lambda: pikepdf.open(f), sizes[f])
+        with pdf:
+            timer.time('metadata', lambda: processor.sanitize(pdf, METADATA_PLAN))
+            timer.time('save', lambda: pdf.save(out_path), sizes[f])
+            if compression != 'None':
+                timer.time('compression', lambda: processor.save_compressed(pdf, out_path, compression), sizes[f])
+        backup_path = timer.time('backup', lambda: processor.backup_file(f), sizes[f])
+        os.remove(backup_path)
+        timer.time('end_to_end', lambda: processor.process_single_file(f, out_path, METADATA_PLAN, compression), sizes[f])
+        os.remove(out_path)
+    return timer.report()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PDF metadata processing stages")
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the JSON results')
+    parser.add_argument('--corpus-dir', help='Reuse or create the corpus here instead of a temporary directory')
+    parser.add_argument('--profiles', nargs='*', choices=PROFILES, default=list(PROFILES))
+    parser.add_argument('--scale', type=float, default=0.2, help='Corpus size multiplier')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compression', choices=['None', 'Low', 'Medium', 'High', 'Maximum'], default='Medium')
+    args = parser.parse_args()
+
+    temp_root = tempfile.mkdtemp(prefix='pdf_bench_')
+    corpus_dir = args.corpus_dir or os.path.join(temp_root, 'corpus')
+    scratch_dir = os.path.join(temp_root, 'scratch')
+    os.makedirs(scratch_dir)
+    try:
+        marker = os.path.join(corpus_dir, 'corpus.json')
+        wanted = {'seed': args.seed, 'scale': args.scale, 'profiles': sorted(args.profiles)}
+        corpus = None
+        if os.path.exists(marker):
+            with open(marker) as f:
+                stored = json.load(f)
+            if stored.get('params') == wanted:
+                corpus = stored['summary']
+        if corpus is None:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+            print(f"Generating corpus in {corpus_dir} ...")
+            corpus = generate_corpus(corpus_dir, args.profiles, args.scale, args.seed)
+            with open(marker, 'w') as f:
+                json.dump({'params': wanted, 'summary': corpus}, f)
+
+        results = {}
+        for profile in args.profiles:
+            print(f"Benchmarking {profile} ...")
+            results[profile] = bench_profile(os.path.join(corpus_dir, profile), scratch_dir, args.compression)
+
+        report = {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pikepdf': pikepdf.__version__,
+            'params': {**wanted, 'compression': args.compression},
+            'corpus': corpus,
+            'results': results,
+            # Whole-run peak: process_single_file resets the VmHWM counter for every file
+            'peak_rss_bytes': max_rss(),
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        for profile, stages in results.items():
+            for stage, entry in stages.items():
+                rate = f"{entry['files_per_s']:.1f} files/s" if entry['files_per_s'] else "-"
+                mbps = f"{entry['mb_per_s']:.1f} MB/s" if entry['mb_per_s'] else ""
+                print(f"  {profile:9s} {stage:12s} {entry['seconds']:8.3f}s  {rate:>16s}  {mbps}")
+        print(f"Peak RSS: {report['peak_rss_bytes']} bytes. Results written to {args.output}")
+    finally:
+        # Holds the scratch outputs, and the corpus unless --corpus-dir was given
+        shutil.rmtree(temp_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Guard CLI startup: --cli must not import tkinter or the GUI, and should start quickly.
+
+Usage: python -m benchmarks.startup [--runs 5] [--max-ms 1500] [--output startup.json]
+Exits with status 1 if a GUI module is imported or the median exceeds --max-ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN_MODULES = ('tkinter', '_tkinter', 'src.gui')
+
+
+def imported_modules(argv):
+    """Run main.py with -X importtime and return the set of modules it imported."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', os.path.join(PROJECT_ROOT, 'main.py'), *argv],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip())
+    return modules
+
+
+def time_run(argv):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(PROJECT_ROOT, 'main.py'), *argv],
+                   cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure CLI startup time and check it stays headless")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=1500.0, help='Fail if the median startup exceeds this')
+    parser.add_argument('--output', help='Optional JSON file for the timings')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as empty_dir:
+        # An empty folder exercises the full --cli path (config, scan, engine) without processing files
+        cases = {
+            'help': ['--cli', '--help'],
+            'cli_empty': ['--cli', empty_dir, '--no-cache', '--jobs', '1'],
+        }
+        report = {}
+        failed = False
+        for name, argv in cases.items():
+            leaked = sorted(m for m in imported_modules(argv) if m in FORBIDDEN_MODULES)
+            timings = [time_run(argv) for _ in range(args.runs)]
+            median_ms = statistics.median(timings) * 1000
+            report[name] = {'median_ms': median_ms, 'min_ms': min(timings) * 1000, 'gui_modules': leaked}
+            status = 'ok'
+            if leaked:
+                status = f"FAIL (imports {', '.join(leaked)})"
+                failed = True
+            elif median_ms > args.max_ms:
+                status = f"FAIL (over {args.max_ms:.0f} ms)"
+                failed = True
+            print(f"{name:10s} median {median_ms:8.1f} ms  min {min(timings) * 1000:8.1f} ms  {status}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,72 +1,84 @@
 import sys
 import os
 import argparse
+import json
 
 # Suppress sandbox warnings on Linux
 if os.name == 'posix':
     os.environ['QPDF_DISABLE_SANDBOX'] = '1'
     os.environ['PYTHONWARNINGS'] = 'ignore::UserWarning'
 
-from src.gui import run_app
-from src.processing import PDFProcessor
-from src.utils import load_config
-
-def parse_metadata_args(args):
-    """Parse --remove-meta, --edit-meta, and --custom-meta CLI args."""
-    remove_vars = {}
-    edit_vars = {}
-    custom_metadata = []
-    if args.remove_meta:
-        for key in args.remove_meta:
-            remove_vars[key] = type('Var', (), {'get': lambda self=True: True})()
-            edit_vars[key] = type('Var', (), {'get': lambda self: ''})()
-    if args.edit_meta:
-        for pair in args.edit_meta:
-            if '=' in pair:
-                key, value = pair.split('=', 1)
-                remove_vars[key] = type('Var', (), {'get': lambda self=True: False})()
-                edit_vars[key] = type('Var', (), {'get': lambda self, v=value: v})()
-    if args.custom_meta:
-        for pair in args.custom_meta:
-            if '=' in pair:
-                key, value = pair.split('=', 1)
-                remove_var = type('Var', (), {'get': lambda self=True: False})()
-                value_var = type('Var', (), {'get': lambda self, v=value: v})()
-                custom_metadata.append((remove_var, key, value_var))
-    return remove_vars, edit_vars, custom_metadata
-
-def collect_pdf_files_cli(paths, recursive, max_depth):
-    pdfs = []
-    for path in paths:
-        if os.path.isfile(path) and path.lower().endswith('.pdf'):
-            pdfs.append(path)
-        elif os.path.isdir(path):
-            for root, dirs, files in os.walk(path):
-                if recursive and max_depth > 0:
-                    depth = root.replace(path, '').count(os.sep)
-                    if depth > max_depth:
-                        continue
-                for file in files:
-                    if file.lower().endswith('.pdf'):
-                        pdfs.append(os.path.join(root, file))
-    return list(set(pdfs))
+# Only lightweight modules are imported here; pikepdf and tkinter are loaded by the mode that needs them
+from src.cache import ProcessedCache, make_fingerprint
+from src.plan import MetadataPlan
+from src.scanner import iter_pdf_files
+from src.utils import load_config, partial_outputs
+
+QPDF_BATCH_SIZE = 64
+
+def parse_metadata_args(args, config=None):
+    """Build the run's MetadataPlan from --remove-meta, --edit-meta and --custom-meta, or from config['metadata'] when none are given."""
+    if not (args.remove_meta or args.edit_meta or args.custom_meta) and config and config.get('metadata'):
+        return MetadataPlan.from_dict(config['metadata'])
+    return MetadataPlan.from_args(args.remove_meta, args.edit_meta, args.custom_meta)
+
+def cli_output_path(pdf_path, args):
+    if args.overwrite:
+        return pdf_path
+    if args.output:
+        if os.path.isdir(args.output):
+            return os.path.join(args.output, os.path.basename(pdf_path))
+        return args.output
+    base, ext = os.path.splitext(pdf_path)
+    return f"{base}_clean{ext}"
+
+def write_profile(profile_path, records):
+    totals = {}
+    for record in records:
+        for stage, seconds in record['stages'].items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    try:
+        with open(profile_path, 'w') as f:
+            json.dump({'files': records, 'stage_totals': totals}, f, indent=1)
+    except OSError as e:
+        print(f"Failed to write profile: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description="Advanced PDF Metadata Remover (GUI & CLI)")
     parser.add_argument('--cli', action='store_true', help='Run in CLI mode')
+    parser.add_argument('--audit', action='store_true', help='Read-only metadata inventory: print one JSON line per file and write nothing')
     parser.add_argument('inputs', nargs='*', help='PDF files or folders to process (CLI mode)')
     parser.add_argument('--output', help='Output directory (CLI mode)')
     parser.add_argument('--overwrite', action='store_true', help='Overwrite original files (CLI mode)')
     parser.add_argument('--backup', action='store_true', help='Backup originals before overwrite (CLI mode)')
+    parser.add_argument('--backup-store', metavar='DIR', help='With --backup, keep backups in a content-addressed store in DIR that stores identical originals once (CLI mode)')
     parser.add_argument('--recursive', action='store_true', help='Recursively process folders (CLI mode)')
     parser.add_argument('--max-depth', type=int, default=3, help='Max recursion depth (CLI mode)')
     parser.add_argument('--compression', choices=['None', 'Low', 'Medium', 'High', 'Maximum'], default='None', help='Compression level (CLI mode)')
+    parser.add_argument('--min-compression-gain', type=float, metavar='PCT', help='Skip recompressing files whose sampled streams are predicted to shrink by less than PCT percent (CLI mode, default: 2)')
+    parser.add_argument('--object-streams', action='store_true', help='With compression, also pack small objects into compressed object streams (CLI mode)')
+    parser.add_argument('--compression-backend', choices=['pikepdf', 'qpdf'], default='pikepdf', help='Compress in-process while saving (pikepdf) or with an external qpdf pass (CLI mode)')
     parser.add_argument('--remove-meta', nargs='*', help='Metadata fields to remove (e.g. --remove-meta /Author /Title)')
     parser.add_argument('--edit-meta', nargs='*', help='Metadata fields to edit (e.g. --edit-meta /Author=Anon /Title=Doc)')
     parser.add_argument('--custom-meta', nargs='*', help='Custom metadata fields (e.g. --custom-meta /MyField=Value)')
+    parser.add_argument('--strip-object-metadata', action='store_true', help='Also remove the XMP streams and /PieceInfo of pages, images and other objects (CLI mode)')
+    parser.add_argument('--incremental', action='store_true', help='Append a new Info dictionary instead of rewriting the file (CLI mode, ignored with compression). The previous Info dictionary stays in the file, so removed values can still be recovered')
+    parser.add_argument('--preserve-signatures', action='store_true', help='With --incremental, skip signed files that cannot be updated incrementally instead of rewriting them')
+    parser.add_argument('--cache-file', default='pdf_remover_cache.json', help='Index of processed files used to skip unchanged inputs (CLI mode)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore the processed-files cache and do not update it (CLI mode)')
+    parser.add_argument('--rebuild-cache', action='store_true', help='Process every file and rebuild the cache from scratch (CLI mode)')
+    parser.add_argument('--cache-hash', action='store_true', help='Also compare a SHA-256 of each input before skipping it (CLI mode)')
+    parser.add_argument('--report', metavar='OUT_JSONL', help="Stream one JSON line per file and a final summary line (files/s, MB/s, latency percentiles) to this file, or '-' for stdout (CLI mode)")
+    parser.add_argument('--profile', metavar='OUT_JSON', help='Write per-file, per-stage timings and byte counts to this JSON file (CLI mode)')
+    parser.add_argument('--profile-mode', choices=['cprofile', 'tracemalloc'], help='With --profile, also capture a cProfile summary or tracemalloc peak per file')
+    parser.add_argument('--memory-budget', metavar='SIZE', help="Per-file memory budget such as 512M or 2G (CLI mode). Files estimated to exceed it run alone after the rest; with --incremental, an incremental update is used instead where it fits. This is a size-based estimate used for scheduling, not a hard limit")
+    parser.add_argument('--jobs-file', metavar='JOBS_JSONL', help="Read per-file jobs from a JSONL file ('-' for stdin), one {\"input\", \"output\", \"remove\", \"set\", \"compression\"} object per line, instead of input paths (CLI mode)")
+    parser.add_argument('--journal', metavar='JOURNAL_JSONL', help='Record every file\'s progress in this checkpoint journal so an interrupted run can be resumed (CLI mode)')
+    parser.add_argument('--resume', metavar='JOURNAL_JSONL', help='Resume an interrupted run from its journal: files it completed are skipped, unfinished ones are redone (CLI mode)')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes (CLI mode, default: CPU count)')
     args = parser.parse_args()
 
-    if args.cli:
+    if args.cli or args.audit:
         # File existence check
         missing = [p for p in args.inputs if not os.path.exists(p)]
         if missing:
@@ -74,57 +86,255 @@ def main():
             for m in missing:
                 print(f"  {m}")
             sys.exit(1)
-        if not args.inputs:
-            print("Usage: python main.py --cli input.pdf [input2.pdf ...] [--output DIR] [--overwrite] [--backup] [--recursive] [--max-depth N] [--compression LEVEL] [--remove-meta ...] [--edit-meta ...] [--custom-meta ...]")
+        if args.audit:
+            if not args.inputs:
+                print("Usage: python main.py --audit input.pdf [folder ...] [--recursive] [--max-depth N] [--jobs N]")
+                sys.exit(1)
+            from src.audit import audit_file
+            from src.batch import BatchEngine
+            engine = BatchEngine(audit_file, jobs=args.jobs, path_of=lambda pdf_path: pdf_path)
+            try:
+                for pdf_path, record, error in engine.run(iter_pdf_files(args.inputs, args.recursive, args.max_depth)):
+                    if error is not None:
+                        record = {'path': pdf_path, 'error': str(error)}
+                    print(json.dumps(record), flush=True)
+            except KeyboardInterrupt:
+                sys.exit(130)
+            sys.exit(0)
+        if args.jobs_file and args.inputs:
+            print("Error: --jobs-file cannot be combined with input files/folders.")
+            sys.exit(1)
+        if args.jobs_file and args.jobs_file != '-' and not os.path.isfile(args.jobs_file):
+            print(f"Error: Jobs file {args.jobs_file} does not exist.")
+            sys.exit(1)
+        if not args.inputs and not args.jobs_file:
+            print("Usage: python main.py --cli input.pdf [input2.pdf ...] [--jobs-file JOBS_JSONL] [--journal FILE | --resume FILE] [--output DIR] [--overwrite] [--backup] [--backup-store DIR] [--recursive] [--max-depth N] [--compression LEVEL] [--remove-meta ...] [--edit-meta ...] [--custom-meta ...] [--incremental] [--no-cache] [--memory-budget SIZE] [--jobs N] [--report FILE|-]")
             sys.exit(1)
+        from src.jobfile import iter_job_file
+        from src.journal import Journal
+        from src.memory import memory_plan, parse_size
+        from src.processing import PDFProcessor, ProcessResult
+        from src.report import ResultReport
+        result_report = ResultReport.open(args.report) if args.report else None
+        if args.report == '-':
+            # stdout now carries only the JSON Lines report; progress messages go to stderr
+            sys.stdout = sys.stderr
         config = load_config('pdf_remover_config.json')
         config['backup'] = args.backup
+        config['backup_store'] = args.backup_store
         config['overwrite'] = args.overwrite
         config['recursive'] = args.recursive
         config['max_depth'] = args.max_depth
+        config['incremental'] = args.incremental
+        config['preserve_signatures'] = args.preserve_signatures
+        config['compression_backend'] = args.compression_backend
+        config['object_streams'] = args.object_streams
+        config['strip_object_metadata'] = args.strip_object_metadata
+        if args.min_compression_gain is not None:
+            config['min_compression_gain'] = args.min_compression_gain / 100
+        config['profile_mode'] = args.profile_mode if args.profile else None
+        config['memory_budget'] = parse_size(args.memory_budget) if args.memory_budget else None
+        plan = parse_metadata_args(args, config)
+
+        def settings_fingerprint(job_plan, level):
+            return make_fingerprint(job_plan.operations, level, args.compression_backend, args.incremental, args.object_streams, args.strip_object_metadata)
+
+        cache = None
+        if not args.no_cache:
+            cache = ProcessedCache(args.cache_file, settings_fingerprint(plan, args.compression), use_hash=args.cache_hash, rebuild=args.rebuild_cache)
+        # With the qpdf backend, workers only edit metadata and the outputs are compressed in qpdf batches
+        qpdf_batch = args.compression_backend == 'qpdf' and (args.compression != 'None' or bool(args.jobs_file))
+        config['qpdf_workers'] = args.jobs
+        worker_level = 'None' if qpdf_batch else args.compression
         processor = PDFProcessor(config)
-        remove_vars, edit_vars, custom_metadata = parse_metadata_args(args)
-        pdf_files = collect_pdf_files_cli(args.inputs, args.recursive, args.max_depth)
-        if not pdf_files:
-            print("No PDF files found.")
-            sys.exit(1)
-        print(f"Found {len(pdf_files)} PDF file(s) to process.")
-        success_count = 0
-        error_count = 0
-        compression_increase_count = 0
-        for pdf_path in pdf_files:
-            if args.overwrite:
-                output_path = pdf_path
-            elif args.output:
-                if os.path.isdir(args.output):
-                    filename = os.path.basename(pdf_path)
-                    output_path = os.path.join(args.output, filename)
-                else:
-                    output_path = args.output
-            else:
-                base, ext = os.path.splitext(pdf_path)
-                output_path = f"{base}_clean{ext}"
-            result = processor.process_single_file(
-                pdf_path,
-                output_path,
-                remove_vars,
-                edit_vars,
-                custom_metadata,
-                args.compression
-            )
+        counts = {'success': 0, 'error': 0, 'compression_increase': 0, 'skipped': 0, 'resumed': 0, 'bytes_saved': 0}
+        deferred = []
+        journal = None
+        if args.journal or args.resume:
+            journal = Journal(args.resume or args.journal, settings_fingerprint(plan, args.compression), resume=bool(args.resume))
+        if args.resume:
+            if journal.previous_fingerprint is not None and journal.previous_fingerprint != journal.fingerprint:
+                print("Warning: The metadata or compression options differ from the journaled run.")
+            print(f"Resuming from {args.resume}: {journal.done_count()} file(s) already done.")
+            # Outputs are atomic, so an interrupted file left at most a temp file behind
+            temp_paths = [temp_path for _, output_path in journal.interrupted() for temp_path in partial_outputs(output_path)]
+            if args.backup_store:
+                from src.backup import BackupStore
+                temp_paths += BackupStore(args.backup_store).partial_objects()
+            for temp_path in temp_paths:
+                try:
+                    os.remove(temp_path)
+                    print(f"Removed partial output: {temp_path}")
+                except OSError as e:
+                    print(f"Could not remove partial output {temp_path}: {e}")
+
+        def job_settings(job):
+            """(MetadataPlan, compression level) a job is processed with."""
+            if len(job) == 2:
+                return plan, args.compression
+            return job[2] if job[2] is not None else plan, job[4]
+
+        def planned_jobs():
+            if not args.jobs_file:
+                # Files are processed while the folders are still being scanned
+                for pdf_path in iter_pdf_files(args.inputs, args.recursive, args.max_depth):
+                    yield pdf_path, cli_output_path(pdf_path, args)
+                return
+            # Jobs carry their own plan and level; the trailing level is bookkeeping process_many passes through
+            for line_number, spec, error in iter_job_file(args.jobs_file):
+                if error is None and not os.path.isfile(spec['input']):
+                    error = f"input {spec['input']} does not exist"
+                if error is None:
+                    output_path = spec['output'] or cli_output_path(spec['input'], args)
+                    try:
+                        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+                    except OSError as e:
+                        error = f"cannot create the output folder for {output_path}: {e}"
+                if error is not None:
+                    print(f"Error in {args.jobs_file} line {line_number}: {error}")
+                    counts['error'] += 1
+                    if result_report is not None:
+                        result_report.add(None, None, 'error', f"{args.jobs_file} line {line_number}: {error}")
+                    continue
+                level = spec['compression'] or args.compression
+                yield spec['input'], output_path, spec['plan'], 'None' if qpdf_batch else level, level
+
+        def pending_jobs():
+            for job in planned_jobs():
+                pdf_path, output_path = job[:2]
+                job_plan, level = job_settings(job)
+                if cache is not None and cache.is_current(pdf_path, output_path, settings_fingerprint(job_plan, level)):
+                    counts['skipped'] += 1
+                    if result_report is not None:
+                        result_report.add(pdf_path, output_path, 'skipped')
+                    continue
+                if journal is not None and journal.is_done(pdf_path, output_path):
+                    counts['resumed'] += 1
+                    if result_report is not None:
+                        result_report.add(pdf_path, output_path, 'skipped')
+                    continue
+                if config['memory_budget']:
+                    try:
+                        size = os.path.getsize(pdf_path)
+                    except OSError as e:
+                        # The file went away or became unreadable after it was listed
+                        print(f"Error processing: {pdf_path} ({e})")
+                        counts['error'] += 1
+                        if journal is not None:
+                            journal.record('failed', pdf_path, output_path)
+                        if result_report is not None:
+                            result_report.add(pdf_path, output_path, 'error', str(e))
+                        continue
+                if config['memory_budget'] and memory_plan(size, level != 'None', config['memory_budget'], args.incremental) == 'defer':
+                    if journal is not None:
+                        journal.record('queued', pdf_path, output_path)
+                    deferred.append(job)
+                    continue
+                yield from started([job])
+
+        def started(jobs):
+            for job in jobs:
+                if journal is not None:
+                    journal.record('in_progress', *job[:2])
+                yield job
+
+        profile_records = []
+
+        def report(outcome):
+            job, result, error, record = outcome.job, outcome.result, outcome.error, outcome.record
+            pdf_path, output_path = job[:2]
+            if args.profile and record is not None:
+                profile_records.append(record)
+            if result is True or result == "compression_increase":
+                if cache is not None:
+                    cache.record(pdf_path, output_path, fingerprint=settings_fingerprint(*job_settings(job)))
+                if journal is not None:
+                    try:
+                        journal.record('done', pdf_path, output_path, os.path.getsize(output_path))
+                    except OSError:
+                        journal.record('failed', pdf_path, output_path)
+            elif journal is not None:
+                journal.record('failed', pdf_path, output_path)
+            if record is not None and record.get('compression', {}).get('decision') == 'compressed':
+                counts['bytes_saved'] += record['compression']['bytes_saved']
+            if result_report is not None:
+                result_report.add(pdf_path, output_path, outcome.status, error, record)
+            memory = ""
+            if config['memory_budget'] and record is not None and record.get('peak_rss'):
+                memory = f" (peak RSS {record['peak_rss'] / 1024 ** 2:.0f} MB)"
             if result is True:
-                print(f"Processed: {pdf_path} -> {output_path}")
-                success_count += 1
+                print(f"Processed: {pdf_path} -> {output_path}{memory}")
+                counts['success'] += 1
             elif result == "compression_increase":
-                print(f"Processed (larger after compression): {pdf_path} -> {output_path}")
-                success_count += 1
-                compression_increase_count += 1
+                print(f"Processed (compression did not help, kept uncompressed): {pdf_path} -> {output_path}{memory}")
+                counts['success'] += 1
+                counts['compression_increase'] += 1
             else:
-                print(f"Error processing: {pdf_path}")
-                error_count += 1
-        print(f"\nSummary: Success: {success_count}, Errors: {error_count}, Files with increased size after compression: {compression_increase_count}")
-        sys.exit(0 if error_count == 0 else 1)
+                print(f"Error processing: {pdf_path} ({error})")
+                counts['error'] += 1
+
+        qpdf_pending = []
+
+        def flush_qpdf_batch():
+            # A jobs file can mix levels, and each qpdf batch runs at a single level
+            by_level = {}
+            for job, record in qpdf_pending:
+                by_level.setdefault(job_settings(job)[1], []).append((job, record))
+            for level, entries in by_level.items():
+                records = [record for _, record in entries]
+                results = processor.compress_outputs([(job[1], record['bytes_metadata']) for job, record in entries], level, records)
+                for (job, record), result in zip(entries, results):
+                    record['result'] = result if isinstance(result, str) else bool(result)
+                    report(ProcessResult(job, result, record.get('error'), record))
+            qpdf_pending.clear()
+
+        def handle(results):
+            for outcome in results:
+                if qpdf_batch and outcome.status == 'success' and outcome.record is not None and job_settings(outcome.job)[1] != 'None':
+                    qpdf_pending.append((outcome.job, outcome.record))
+                    if len(qpdf_pending) >= QPDF_BATCH_SIZE:
+                        flush_qpdf_batch()
+                    continue
+                report(outcome)
+
+        interrupted = False
+        try:
+            handle(processor.process_many(pending_jobs(), plan, worker_level, jobs=args.jobs))
+            if deferred:
+                # The pool has finished, so each of these has the machine's memory to itself
+                print(f"Processing {len(deferred)} file(s) over the memory budget one at a time...")
+                handle(processor.process_many(started(deferred), plan, worker_level, jobs=1, isolate=True))
+            if qpdf_pending:
+                flush_qpdf_batch()
+        except KeyboardInterrupt:
+            interrupted = True
+            print("\nInterrupted. Remaining files were not processed.")
+        finally:
+            # Keep what finished even when the run dies on an unexpected error
+            if cache is not None:
+                cache.save()
+            if journal is not None:
+                journal.close()
+            if result_report is not None:
+                result_report.close()
+            if args.profile:
+                write_profile(args.profile, profile_records)
+        if not interrupted and counts['success'] + counts['error'] + counts['skipped'] + counts['resumed'] == 0:
+            print("No PDF files found.")
+            sys.exit(1)
+        summary = f"\nSummary: Success: {counts['success']}, Errors: {counts['error']}, Files where compression did not help: {counts['compression_increase']}"
+        if args.compression != 'None' or args.jobs_file:
+            summary += f", Bytes saved by compression: {counts['bytes_saved']}"
+        if counts['skipped']:
+            summary += f", Skipped (unchanged): {counts['skipped']}"
+        if counts['resumed']:
+            summary += f", Already done (journal): {counts['resumed']}"
+        print(summary)
+        if interrupted:
+            sys.exit(130)
+        sys.exit(0 if counts['error'] == 0 else 1)
     else:
+        from src.gui import run_app
         run_app()
 
 if __name__ == "__main__":
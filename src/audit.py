@@ -0,0 +1,39 @@
+import os
+from typing import Any, Dict
+
+import pikepdf
+
+
+def _value_length(value: Any) -> int:
+    if isinstance(value, pikepdf.String):
+        return len(bytes(value))
+    if isinstance(value, (pikepdf.Name, pikepdf.Dictionary, pikepdf.Array)):
+        return len(value.unparse())
+    return len(str(value))
+
+
+def audit_file(pdf_path: str) -> Dict[str, Any]:
+    """Read-only metadata inventory of a single PDF.
+
+    Only the trailer, the Info dictionary and the catalog's /Metadata entry
+    are touched; the page tree is never loaded and nothing is written.
+    """
+    record: Dict[str, Any] = {'path': pdf_path}
+    try:
+        record['size'] = os.path.getsize(pdf_path)
+        # Skip pushing inherited attributes down the page tree, which would walk every page
+        with pikepdf.open(pdf_path, inherit_page_attributes=False) as pdf:
+            record['encrypted'] = pdf.is_encrypted
+            record['version'] = pdf.pdf_version
+            info = pdf.trailer.get('/Info')
+            record['info'] = {str(key): _value_length(value) for key, value in info.items()} if isinstance(info, pikepdf.Dictionary) else {}
+            metadata = pdf.Root.get('/Metadata')
+            record['xmp'] = isinstance(metadata, pikepdf.Stream)
+            if record['xmp']:
+                record['xmp_length'] = int(metadata.get('/Length', 0))
+    except pikepdf.PasswordError:
+        record['encrypted'] = True
+        record['error'] = "password required"
+    except Exception as e:
+        record['error'] = str(e)
+    return record
@@ -0,0 +1,174 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+FICLONE = 0x40049409  # Linux ioctl that makes dst share src's extents (btrfs, XFS, ...)
+COPY_CHUNK = 8 * 1024 * 1024
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+
+
+def _try_reflink(src_fd: int, dst_fd: int) -> bool:
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def _try_copy_file_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(src_fd, dst_fd, size - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError:
+        # Cross-device or unsupported filesystem: undo any partial copy and let the caller stream
+        os.ftruncate(dst_fd, 0)
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+        os.lseek(src_fd, 0, os.SEEK_SET)
+        return False
+    return copied == size
+
+
+def copy_into(src_path: str, dst_fd: int) -> str:
+    """Copy src_path into the empty, open dst_fd as cheaply as the filesystem allows.
+
+    Tries a reflink clone, then copy_file_range (copied in the kernel and
+    offloaded by NFS/SMB servers), then a plain streaming copy. Returns the
+    method used: 'reflink', 'copy_file_range' or 'stream'.
+    """
+    with open(src_path, 'rb') as src:
+        src_fd = src.fileno()
+        if _try_reflink(src_fd, dst_fd):
+            return 'reflink'
+        if _try_copy_file_range(src_fd, dst_fd, os.fstat(src_fd).st_size):
+            return 'copy_file_range'
+        with os.fdopen(os.dup(dst_fd), 'wb') as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+        return 'stream'
+
+
+def copy_to_temp(src_path: str, directory: str, prefix: str) -> Tuple[str, str]:
+    """Copy src_path to a new, fsynced <prefix>*.tmp file in directory; returns (temp_path, method).
+
+    A process killed mid-copy leaves only a .tmp file, never a truncated
+    file under a real name.
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=prefix, suffix='.tmp', dir=directory)
+    try:
+        method = copy_into(src_path, fd)
+        os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        os.remove(temp_path)
+        raise
+    os.close(fd)
+    shutil.copystat(src_path, temp_path)
+    return temp_path, method
+
+
+def claim_name(temp_path: str, base_path: str) -> str:
+    """Move temp_path to base_path, or base_path_1, base_path_2, ... if taken; never replaces a file.
+
+    A hard link claims the name atomically, even across processes. Where
+    the filesystem has no hard links, a checked rename is used instead.
+    """
+    path = base_path
+    counter = 0
+    while True:
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            counter += 1
+            path = f"{base_path}_{counter}"
+            continue
+        except OSError:
+            if os.path.exists(path):
+                counter += 1
+                path = f"{base_path}_{counter}"
+                continue
+            os.replace(temp_path, path)
+            return path
+        os.remove(temp_path)
+        return path
+
+
+def sibling_backup(pdf_path: str) -> Tuple[str, str]:
+    """Back pdf_path up to a new .bak_<timestamp> file next to it; returns (backup_path, method).
+
+    The copy is written as a hidden temp file that partial_outputs(pdf_path)
+    finds, so an interrupted backup is cleaned up with the output's temp files.
+    """
+    directory = os.path.dirname(os.path.abspath(pdf_path))
+    temp_path, method = copy_to_temp(pdf_path, directory, f".{os.path.basename(pdf_path)}.")
+    try:
+        return claim_name(temp_path, f"{pdf_path}.bak_{int(time.time())}"), method
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class BackupStore:
+    def __init__(self, root: str) -> None:
+        """Content-addressed backup store: identical originals are kept once.
+
+        Objects live under objects/<sha256[:2]>/<sha256>.pdf and every backup
+        appends a line to manifest.jsonl mapping the original path and time
+        to its object, which is what a restore looks up.
+        """
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifest_path = os.path.join(root, 'manifest.jsonl')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @staticmethod
+    def digest(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.pdf")
+
+    def partial_objects(self) -> List[str]:
+        """Temp files left in the store by backups whose process was killed."""
+        return glob.glob(os.path.join(glob.escape(self.objects_dir), '*', '.*.tmp'))
+
+    def backup(self, pdf_path: str) -> Tuple[str, str]:
+        """Store pdf_path unless an identical original is already stored; returns (object_path, method)."""
+        digest = self.digest(pdf_path)
+        object_path = self.object_path(digest)
+        method = 'dedup'
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temp_path, method = copy_to_temp(pdf_path, os.path.dirname(object_path), f".{digest}.pdf.")
+            # A concurrent writer of the same content simply replaces an identical object
+            os.replace(temp_path, object_path)
+        entry = {'path': os.path.abspath(pdf_path), 'sha256': digest, 'time': time.time(), 'size': os.path.getsize(object_path)}
+        # One short O_APPEND write per entry, so concurrent workers do not interleave lines
+        fd = os.open(self.manifest_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | _O_BINARY, 0o666)
+        try:
+            os.write(fd, (json.dumps(entry) + '\n').encode('utf-8'))
+        finally:
+            os.close(fd)
+        return object_path, method
+
+
+def make_backup(pdf_path: str, store: Optional[BackupStore] = None) -> Tuple[str, str]:
+    """Back pdf_path up into store if given, otherwise next to the file; returns (path, method)."""
+    if store is not None:
+        return store.backup(pdf_path)
+    return sibling_backup(pdf_path)
@@ -0,0 +1,260 @@
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    from .pipeline import Pipeline, prefetch
+    from .plan import MetadataPlan
+    from .processing import PDFProcessor
+    from .qpdf_backend import kill_running
+except ImportError:
+    from pipeline import Pipeline, prefetch
+    from plan import MetadataPlan
+    from processing import PDFProcessor
+    from qpdf_backend import kill_running
+
+
+TERMINATE_POLL_SECONDS = 0.5  # How often run() notices a terminate() from another thread
+TERMINATE_JOIN_SECONDS = 5.0  # Longest wait in terminate() for killed workers to exit
+
+
+def default_jobs() -> int:
+    """Number of worker processes to use when --jobs is not given."""
+    return os.cpu_count() or 1
+
+
+# Per-process state populated by _init_worker
+_worker_processor: Optional[PDFProcessor] = None
+_worker_args: Tuple = ()
+_worker_events: Any = None
+
+
+def _init_worker(config: Dict[str, Any], plan: MetadataPlan, compression_level: str, events: Any = None) -> None:
+    """Set up the per-process processor.
+
+    events is an optional multiprocessing queue; when given, log lines and
+    ('start'|'done', pid, input, output) notifications are sent through it.
+    """
+    global _worker_processor, _worker_args, _worker_events
+    _worker_events = events
+    log_callback = None
+    if events is not None:
+        pid = os.getpid()
+        log_callback = lambda message, level="info": events.put(('log', pid, level, message))  # noqa: E731
+    _worker_processor = PDFProcessor(config, log_callback=log_callback)
+    _worker_args = (plan, compression_level)
+
+
+def _process_job(job: Tuple) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Process one job, returning the result and its stage-timing record.
+
+    A job is an (input, output) pair processed with the worker's settings,
+    or (input, output, plan, compression_level) to override them for
+    that file; plan may be None to keep the worker's MetadataPlan.
+    """
+    pdf_path, output_path = job[:2]
+    args = _worker_args
+    if len(job) > 2:
+        plan, compression_level = job[2:4]
+        args = (plan if plan is not None else _worker_args[0], compression_level)
+    if _worker_events is not None:
+        _worker_events.put(('start', os.getpid(), pdf_path, output_path))
+    try:
+        result = _worker_processor.process_single_file(pdf_path, output_path, *args)
+        return result, _worker_processor.last_record
+    except Exception:
+        return False, None
+    finally:
+        if _worker_events is not None:
+            _worker_events.put(('done', os.getpid(), pdf_path, output_path))
+
+
+def _terminate_worker(signum: int, frame: Any) -> None:
+    # qpdf children would otherwise outlive the worker and keep writing their temp files
+    kill_running()
+    os._exit(128 + signum)
+
+
+def _worker_initializer(initializer: Optional[Callable], initargs: Tuple) -> None:
+    # Ctrl-C is handled by the parent, which shuts the pool down cleanly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _terminate_worker)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+class BatchEngine:
+    def __init__(self, func: Callable[[Any], Any], jobs: Optional[int] = None, initializer: Optional[Callable] = None, initargs: Tuple = (), max_pending: Optional[int] = None, isolate: bool = False, path_of: Optional[Callable[[Any], str]] = None, ordered: bool = False) -> None:
+        """Run func over many items on a process pool, yielding results in completion order.
+
+        func, initializer and every item must be picklable. With jobs=1 the
+        items are processed inline, without spawning a pool, unless isolate
+        is set; isolated work can always be stopped with terminate(). The
+        inline path is a Pipeline, so output commits overlap the next file.
+        path_of maps an item to its input file, which is then read ahead.
+        With ordered, results are yielded in input order instead; finished
+        results waiting on an earlier item count towards max_pending, so a
+        slow file holds back the pool rather than growing a buffer.
+        """
+        self.func = func
+        self.jobs = max(1, jobs or default_jobs())
+        self.initializer = initializer
+        self.initargs = initargs
+        self.isolate = isolate
+        self.path_of = path_of
+        self.ordered = ordered
+        # Bound the number of submitted futures so huge inputs are consumed lazily
+        self.max_pending = max_pending or self.jobs * 4
+        self.executor = None
+
+    def run(self, items: Iterable[Any]) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """Yield (item, result, error) tuples; error is set when the worker itself failed.
+
+        On an interrupt such as KeyboardInterrupt, the files already in
+        progress are finished and yielded before the exception propagates.
+        If a worker dies (an OOM kill or a native crash), the pool is rebuilt
+        and the unfinished items are re-run one at a time, each in a fresh
+        process, so only the item that crashes again gets an error.
+        """
+        if self.jobs == 1 and not self.isolate:
+            if self.initializer is not None:
+                self.initializer(*self.initargs)
+            yield from Pipeline(self.func, self.path_of).run(items)
+            return
+        if self.path_of is not None:
+            # Workers already overlap each other's I/O; reading ahead keeps the next inputs cached
+            items = prefetch(items, self.path_of)
+        executor = self.executor = self._new_executor(self.jobs)
+        pending = {}
+        items = iter(items)
+        exhausted = False
+        try:
+            while True:
+                # Stop feeding the pool once terminate() has been called from another thread
+                exhausted = exhausted or self.executor is not executor
+                while not exhausted and len(pending) < self.max_pending:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[executor.submit(self.func, item)] = item
+                if self.executor is not executor:
+                    # Futures cancelled by terminate() never complete, so stop waiting on them
+                    for future in [f for f in pending if f.cancelled()]:
+                        del pending[future]
+                if not pending:
+                    break
+                if self.ordered:
+                    # pending keeps submission order: wait for the oldest item, then yield the finished head of the queue
+                    wait([next(iter(pending))], timeout=TERMINATE_POLL_SECONDS)
+                    done = []
+                    for future in pending:
+                        if not future.done():
+                            break
+                        done.append(future)
+                else:
+                    done, _ = wait(pending, timeout=TERMINATE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    # After terminate() a broken pool is expected and its in-flight items are reported as failed
+                    if self.executor is executor and isinstance(future.exception(), BrokenProcessPool):
+                        broken = True
+                        break
+                    item = pending.pop(future)
+                    try:
+                        yield item, future.result(), None
+                    except Exception as e:
+                        yield item, None, e
+                if broken:
+                    executor.shutdown(wait=True)
+                    yield from self._recover(pending)
+                    if self.executor is None:
+                        # terminate() was called while recovering
+                        executor = None
+                        break
+                    executor = self.executor = self._new_executor(self.jobs)
+        except BaseException as e:
+            self.cancel()
+            if isinstance(e, GeneratorExit):
+                raise
+            # cancel() let the files in progress finish; report them so the caller's totals match the outputs on disk
+            for future, item in pending.items():
+                if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+                    continue
+                try:
+                    yield item, future.result(), None
+                except Exception as error:
+                    yield item, None, error
+            raise
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.executor = None
+
+    def _new_executor(self, workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_worker_initializer,
+            initargs=(self.initializer, self.initargs)
+        )
+
+    def _recover(self, pending: Dict[Any, Any]) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """Yield the items of a broken pool, re-running each unfinished one alone in a fresh process."""
+        for future in list(pending):
+            item = pending[future]
+            if not future.cancelled() and not isinstance(future.exception(), BrokenProcessPool):
+                # Finished before the crash
+                del pending[future]
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+                continue
+            executor = self.executor = self._new_executor(1)
+            retry = executor.submit(self.func, item)
+            # Tracked in pending so an interrupt still reports it
+            del pending[future]
+            pending[retry] = item
+            try:
+                outcome = (retry.result(), None)
+            except Exception as e:
+                outcome = (None, e)
+            executor.shutdown(wait=True)
+            del pending[retry]
+            terminated = self.executor is not executor
+            yield (item,) + outcome
+            if terminated:
+                # terminate() drops the items that have not run yet
+                self.executor = None
+                pending.clear()
+                return
+
+    def cancel(self) -> None:
+        """Drop queued items and wait for the files already in progress to finish."""
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def terminate(self) -> None:
+        """Drop queued items and kill the worker processes without waiting for in-flight files.
+
+        Safe to call from another thread while run() is iterating; the
+        in-flight items are then yielded with a BrokenProcessPool error.
+        Returns once the workers, and the qpdf processes they started, have
+        exited (or after TERMINATE_JOIN_SECONDS), so their temp files can be
+        cleaned up safely.
+        """
+        executor, self.executor = self.executor, None
+        if executor is None:
+            return
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + TERMINATE_JOIN_SECONDS
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
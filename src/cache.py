@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+CACHE_VERSION = 1
+
+
+def make_fingerprint(*parts: Any) -> str:
+    """Stable hash of the settings that determine a file's output (metadata rules, compression, ...)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ProcessedCache:
+    def __init__(self, cache_file: str, fingerprint: str, use_hash: bool = False, rebuild: bool = False) -> None:
+        """On-disk index of processed inputs, used to skip files that have not changed since the last run.
+
+        Entries are keyed by absolute input path and store size, mtime, an
+        optional content hash and the settings fingerprint they were processed
+        with. With rebuild the existing index is ignored and overwritten.
+        """
+        self.cache_file = cache_file
+        self.fingerprint = fingerprint
+        self.use_hash = use_hash
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._unsaved = 0
+        if not rebuild:
+            self.load()
+
+    def load(self) -> None:
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    self.entries = data.get('entries', {})
+        except (json.JSONDecodeError, OSError, AttributeError):
+            print(f"Warning: Cache file {self.cache_file} is unreadable. Starting with an empty cache.")
+            self.entries = {}
+
+    def save(self) -> None:
+        """Write the index atomically, so a crash never leaves a truncated cache file."""
+        tmp_path = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'entries': self.entries}, f)
+            os.replace(tmp_path, self.cache_file)
+            self._unsaved = 0
+        except OSError as e:
+            print(f"Failed to save cache: {e}")
+
+    def _stat_entry(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            return None
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def is_current(self, pdf_path: str, output_path: str, fingerprint: Optional[str] = None) -> bool:
+        """Return True if pdf_path was already processed with the same settings and has not changed since.
+
+        fingerprint overrides the cache-wide one for files with their own settings.
+        """
+        entry = self.entries.get(os.path.abspath(pdf_path))
+        if not entry or entry.get('fingerprint') != (fingerprint or self.fingerprint):
+            return False
+        if entry.get('output') != os.path.abspath(output_path) or not os.path.exists(output_path):
+            return False
+        current = self._stat_entry(pdf_path)
+        if current is None or current['size'] != entry.get('size') or current['mtime_ns'] != entry.get('mtime_ns'):
+            return False
+        if self.use_hash:
+            return entry.get('sha256') is not None and file_digest(pdf_path) == entry['sha256']
+        return True
+
+    def record(self, pdf_path: str, output_path: str, save_every: int = 500, fingerprint: Optional[str] = None) -> None:
+        """Remember pdf_path as processed; called after the file was written successfully."""
+        entry = self._stat_entry(pdf_path)
+        if entry is None:
+            return
+        entry['fingerprint'] = fingerprint or self.fingerprint
+        entry['output'] = os.path.abspath(output_path)
+        if self.use_hash:
+            entry['sha256'] = file_digest(pdf_path)
+        self.entries[os.path.abspath(pdf_path)] = entry
+        self._unsaved += 1
+        if self._unsaved >= save_every:
+            self.save()
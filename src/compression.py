@@ -0,0 +1,166 @@
+import heapq
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import pikepdf
+
+FLATE_LEVELS = {"Low": 1, "Medium": 5, "High": 7, "Maximum": 9}
+DEFAULT_FLATE_LEVEL = -1  # zlib's default, which pikepdf uses unless told otherwise
+# Image codecs that Flate cannot shrink further
+PASSTHROUGH_FILTERS = {'/DCTDecode', '/JPXDecode', '/JBIG2Decode', '/CCITTFaxDecode'}
+SAMPLE_STREAMS = 16  # The largest streams carry most of the bytes, so only those are sampled
+SAMPLE_BYTES = 256 * 1024  # Decoded bytes per sampled stream that are recompressed for the estimate
+DEFAULT_MIN_GAIN = 0.02  # Skip recompression when less than this fraction of stream bytes would be saved
+
+
+def stream_filters(stream: pikepdf.Stream) -> List[str]:
+    filters = stream.get('/Filter')
+    if filters is None:
+        return []
+    if isinstance(filters, pikepdf.Array):
+        return [str(f) for f in filters]
+    return [str(filters)]
+
+
+def zlib_header_level(level: int) -> int:
+    """FLEVEL value zlib writes into the stream header for a compression level (0 fastest .. 3 maximum)."""
+    if level < 2:
+        return 0
+    if level < 6:
+        return 1
+    return 2 if level == 6 else 3
+
+
+def flate_level_of(raw: bytes) -> Optional[int]:
+    """FLEVEL from the zlib header of Flate-encoded data, or None if it is not a valid zlib header."""
+    if len(raw) < 2 or raw[0] & 0x0F != 8 or ((raw[0] << 8) | raw[1]) % 31:
+        return None
+    return raw[1] >> 6
+
+
+def _predicted_size(stream: pikepdf.Stream, encoded_length: int, level: int) -> int:
+    filters = stream_filters(stream)
+    if any(f in PASSTHROUGH_FILTERS for f in filters):
+        return encoded_length
+    raw = stream.read_raw_bytes()
+    if not filters:
+        sample = raw[:SAMPLE_BYTES]
+        if not sample:
+            return encoded_length
+        return int(len(raw) * len(zlib.compress(sample, level)) / len(sample))
+    if filters == ['/FlateDecode']:
+        header_level = flate_level_of(raw)
+        if header_level is not None and header_level >= zlib_header_level(level):
+            return encoded_length  # Left untouched by apply_stream_policy
+        # Inflate only a prefix and compare how much encoded input it took with how small it recompresses
+        inflater = zlib.decompressobj()
+        try:
+            sample = inflater.decompress(raw, SAMPLE_BYTES)
+        except zlib.error:
+            return encoded_length
+        consumed = len(raw) - len(inflater.unconsumed_tail) - len(inflater.unused_data)
+        if not sample or not consumed:
+            return encoded_length
+        return int(encoded_length * len(zlib.compress(sample, level)) / consumed)
+    # Other chains (LZW, ASCII85, RunLength, ...): recompress a prefix of the fully decoded data
+    try:
+        data = stream.read_bytes()
+    except pikepdf.PdfError:
+        return encoded_length
+    sample = data[:SAMPLE_BYTES]
+    if not sample:
+        return encoded_length
+    return min(encoded_length, int(len(data) * len(zlib.compress(sample, level)) / len(sample)))
+
+
+def estimate_compression_gain(pdf: pikepdf.Pdf, level: str) -> Dict[str, Any]:
+    """Predict the fraction of stream bytes recompression at level would save.
+
+    Only stream dictionaries are inspected to pick the SAMPLE_STREAMS largest
+    streams; of those, a decoded prefix is recompressed with zlib. Returns
+    {'predicted_gain', 'sampled_streams', 'sampled_bytes'}.
+    """
+    flate_level = FLATE_LEVELS.get(level, 6)
+    candidates: List[Tuple[int, int, pikepdf.Stream]] = []
+    for index, obj in enumerate(pdf.objects):
+        if isinstance(obj, pikepdf.Stream):
+            try:
+                length = int(obj.get('/Length', 0))
+            except (TypeError, ValueError):
+                continue
+            candidates.append((length, index, obj))
+    sampled = heapq.nlargest(SAMPLE_STREAMS, candidates, key=lambda c: (c[0], -c[1]))
+    total = sum(length for length, _, _ in sampled)
+    if not total:
+        return {'predicted_gain': 0.0, 'sampled_streams': 0, 'sampled_bytes': 0}
+    predicted = 0
+    for length, _, stream in sampled:
+        try:
+            predicted += min(length, _predicted_size(stream, length, flate_level))
+        except Exception:
+            predicted += length  # Unreadable streams are assumed incompressible
+    return {'predicted_gain': (total - predicted) / total, 'sampled_streams': len(sampled), 'sampled_bytes': total}
+
+
+def _recompressed(stream: pikepdf.Stream, level: int) -> Optional[Tuple[bytes, Any, int]]:
+    """Flate data, DecodeParms and the old encoded length to replace stream with, or None to pass it through."""
+    filters = stream_filters(stream)
+    if any(f in PASSTHROUGH_FILTERS for f in filters):
+        return None
+    raw = stream.read_raw_bytes()
+    decode_parms = None
+    if filters == ['/FlateDecode']:
+        header_level = flate_level_of(raw)
+        if header_level is not None and header_level >= zlib_header_level(level):
+            return None
+        try:
+            data = zlib.decompress(raw)
+        except zlib.error:
+            return None
+        # Predictor parameters still describe the inflated bytes, so they are kept
+        decode_parms = stream.get('/DecodeParms')
+        if isinstance(decode_parms, pikepdf.Array):
+            decode_parms = decode_parms[0] if len(decode_parms) else None
+        if decode_parms is not None and not isinstance(decode_parms, pikepdf.Dictionary):
+            decode_parms = None
+    elif not filters:
+        data = raw
+    else:
+        try:
+            data = stream.read_bytes()
+        except pikepdf.PdfError:
+            return None
+    encoded = zlib.compress(data, level)
+    if len(encoded) >= len(raw):
+        return None
+    return encoded, decode_parms, len(raw)
+
+
+def apply_stream_policy(pdf: pikepdf.Pdf, level: str) -> Dict[str, int]:
+    """Recompress only the streams of pdf that benefit from Flate at level.
+
+    Image codecs (DCT, JPX, JBIG2, CCITT) and Flate data whose zlib header
+    shows an equal or stronger level are passed through. Uncompressed,
+    weakly compressed and other-filtered streams are re-encoded one at a
+    time and replaced only if that makes them smaller. Save afterwards with
+    stream_decode_level=none and compress_streams=False so the remaining
+    streams are copied as they are.
+    """
+    flate_level = FLATE_LEVELS.get(level, 6)
+    stats = {'streams': 0, 'passed_through': 0, 'recompressed': 0, 'bytes_saved': 0}
+    for obj in pdf.objects:
+        if not isinstance(obj, pikepdf.Stream):
+            continue
+        stats['streams'] += 1
+        try:
+            replacement = _recompressed(obj, flate_level)
+        except Exception:
+            replacement = None  # Unreadable streams are copied as they are
+        if replacement is None:
+            stats['passed_through'] += 1
+            continue
+        data, decode_parms, old_length = replacement
+        stats['bytes_saved'] += old_length - len(data)
+        obj.write(data, filter=pikepdf.Name.FlateDecode, decode_parms=decode_parms)
+        stats['recompressed'] += 1
+    return stats
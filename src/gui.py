@@ -1,14 +1,39 @@
+import multiprocessing
 import os
+import queue
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 try:
+    from .backup import BackupStore
+    from .batch import BatchEngine, _init_worker, _process_job, default_jobs
+    from .cache import make_fingerprint
+    from .journal import Journal, read_journal
+    from .plan import MetadataPlan
     from .processing import PDFProcessor
-    from .utils import load_config, save_config
+    from .registry import FileRegistry
+    from .scanner import iter_pdf_files
+    from .utils import load_config, partial_outputs, save_config
 except ImportError:
+    from backup import BackupStore
+    from batch import BatchEngine, _init_worker, _process_job, default_jobs
+    from cache import make_fingerprint
+    from journal import Journal, read_journal
+    from plan import MetadataPlan
     from processing import PDFProcessor
-    from utils import load_config, save_config
+    from registry import FileRegistry
+    from scanner import iter_pdf_files
+    from utils import load_config, partial_outputs, save_config
 import random
+import time
+
+UI_POLL_MS = 100  # How often the Tk main loop drains queued UI events
+UI_MAX_EVENTS_PER_TICK = 5000  # Bound the work done per drain so the UI stays responsive
+MAX_LOG_LINES = 5000  # Older log lines are dropped so the log widget stays fast
+ADD_BATCH_SIZE = 500  # Files handed from the scan thread to the UI per batch
+MAX_LISTED_FILES = 100  # Larger batches are summarized in the log instead of listed
+MONITOR_POLL_SECONDS = 0.2  # How often the worker monitor checks whether it should stop
+MONITOR_JOIN_SECONDS = 2.0  # Longest wait for the monitor when processing ends
 
 class Tooltip:
     def __init__(self, widget, text: str):
@@ -44,9 +69,16 @@ class AdvancedPDFMetadataRemover:
         self.root = tk.Tk()
         self.config_file = "pdf_remover_config.json"
         self.config = load_config(self.config_file)
-        self.processor = PDFProcessor(self.config, log_callback=self.log_message, status_callback=self.update_status)
+        self.journal_file = "pdf_remover_journal.jsonl"  # Kept only while a run is unfinished
+        self.journal = None
+        # Worker threads never touch widgets directly; they queue events drained by _drain_ui_queue
+        self.ui_queue = queue.Queue()
+        self.processor = PDFProcessor(self.config, log_callback=self.log_message, status_callback=self.update_status, confirm_callback=self.confirm)
         self.cancel_flag = False
-        self.file_paths_to_process = []
+        self.file_registry = FileRegistry()  # Queued, already validated PDFs in insertion order
+        self.scans_in_progress = 0
+        self.engine = None  # BatchEngine of the running batch, used by Stop to kill in-flight workers
+        self.in_flight = {}  # Worker pid -> (input, output) it is currently writing
         self.current_file_index = 0
         self.total_files = 0
         self.progress_bar = None
@@ -59,6 +91,8 @@ class AdvancedPDFMetadataRemover:
         self.show_errors_var = tk.BooleanVar(master=self.root, value=self.config.get('show_errors', False))
         self.output_path_var = tk.StringVar(master=self.root, value=self.config.get('output_path', ''))
         self.max_depth_var = tk.StringVar(master=self.root, value=str(self.config.get('max_depth', 3)))
+        self.workers_var = tk.StringVar(master=self.root, value=str(self.config.get('workers', default_jobs())))
+        self.strip_object_metadata_var = tk.BooleanVar(master=self.root, value=self.config.get('strip_object_metadata', False))
         self.metadata_remove_vars = {}
         self.metadata_edit_vars = {}
         self.custom_metadata = []
@@ -67,6 +101,7 @@ class AdvancedPDFMetadataRemover:
         self.settings_frame = None
         self.setup_gui()
         self.root.report_callback_exception = self.global_error_handler
+        self.root.after(UI_POLL_MS, self._drain_ui_queue)
 
     def setup_gui(self):
         self.root.title("Advanced PDF Metadata Remover")
@@ -226,33 +261,55 @@ class AdvancedPDFMetadataRemover:
                 self.output_path_var.set(directory)
 
     def add_files(self, paths):
-        pdfs_to_add = []
+        """Queue files and folders; folders are scanned and validated on a background thread."""
+        existing = []
         for path in paths:
             if not os.path.exists(path):
                 self.log_message(f"Warning: File or folder does not exist: {path.replace('\\', '/')}" , "warning")
                 messagebox.showwarning("File Not Found", f"File or folder does not exist: {path.replace('\\', '/')}" , parent=self.root)
                 continue
-            if os.path.isdir(path):
-                pdfs = self.collect_pdf_files([path])
-                for pdf in pdfs:
-                    if pdf not in self.file_paths_to_process:
-                        pdfs_to_add.append(pdf)
-            elif os.path.isfile(path) and self.is_valid_pdf(path):
-                if path not in self.file_paths_to_process:
-                    pdfs_to_add.append(path)
-        self.file_paths_to_process.extend(pdfs_to_add)
-        if pdfs_to_add:
-            self.log_message("Added files:", "info")
-            for f in pdfs_to_add:
-                self.log_message(f"  {f.replace('\\', '/')}" , "info")
+            existing.append(path)
+        if not existing:
+            return
+        # Tk variables must be read on the main thread
+        recursive = self.recursive_var.get() if self.recursive_var is not None else True
+        max_depth = int(self.max_depth_var.get()) if self.max_depth_var is not None else 0
+        self.scans_in_progress += 1
+        self.update_status("Scanning for PDF files...")
+        threading.Thread(target=self._scan_files, args=(existing, recursive, max_depth), daemon=True).start()
+
+    def _scan_files(self, paths, recursive, max_depth):
+        batch = []
+        try:
+            for pdf in iter_pdf_files(paths, recursive, max_depth, is_valid=self.file_registry.is_valid_pdf):
+                batch.append(pdf)
+                if len(batch) >= ADD_BATCH_SIZE:
+                    self.run_on_ui(self._register_files, batch)
+                    batch = []
+        except Exception as e:
+            self.log_message(f"Scan error: {e}", "error")
+        finally:
+            self.run_on_ui(self._register_files, batch, True)
+
+    def _register_files(self, pdfs, scan_finished=False):
+        added = self.file_registry.add_many(pdfs)
+        if added:
+            if len(added) <= MAX_LISTED_FILES:
+                self.log_message("Added files:", "info")
+                for f in added:
+                    self.log_message(f"  {f.replace('\\', '/')}" , "info")
+            else:
+                self.log_message(f"Added {len(added)} files.", "info")
         self.update_file_count()
-        self.update_status()
-        # If you have update_extra_metadata_fields, call it here if needed
+        if scan_finished:
+            self.scans_in_progress -= 1
+            if self.scans_in_progress == 0:
+                self.update_status()
 
     def reset_everything(self):
         """Reset everything to default state."""
         # Clear file list
-        self.file_paths_to_process.clear()
+        self.file_registry.clear()
         
         # Reset all configuration variables to defaults
         self.backup_var.set(True)
@@ -261,6 +318,8 @@ class AdvancedPDFMetadataRemover:
         self.show_errors_var.set(False)
         self.output_path_var.set("")
         self.max_depth_var.set("3")
+        self.workers_var.set(str(default_jobs()))
+        self.strip_object_metadata_var.set(False)
         self.compression_level_var.set("None")
         
         # Clear metadata settings
@@ -275,8 +334,7 @@ class AdvancedPDFMetadataRemover:
             self.log_box.config(state=tk.DISABLED)
         
         # Reset progress and status
-        if hasattr(self, 'progress_bar') and self.progress_bar is not None:
-            self.progress_bar['value'] = 0
+        self.set_progress(0)
         
         # Update UI
         self.update_file_count()
@@ -286,33 +344,6 @@ class AdvancedPDFMetadataRemover:
         self.log_message("Advanced PDF Metadata Remover v2.0.0", "info")
         self.log_message("Application reset to default state. Ready to begin.", "info")
 
-    def collect_pdf_files(self, paths):
-        pdfs = []
-        recursive = self.recursive_var.get() if self.recursive_var is not None else True
-        max_depth = int(self.max_depth_var.get()) if (self.max_depth_var is not None and recursive) else 0
-        for path in paths:
-            if os.path.isfile(path) and self.is_valid_pdf(path):
-                pdfs.append(path)
-            elif os.path.isdir(path):
-                for root, dirs, files in os.walk(path):
-                    if max_depth > 0:
-                        depth = root.replace(path, '').count(os.sep)
-                        if depth > max_depth:
-                            continue
-                    for file in files:
-                        if self.is_valid_pdf(os.path.join(root, file)):
-                            pdfs.append(os.path.join(root, file))
-        return list(set(pdfs))
-
-    def is_valid_pdf(self, file_path):
-        try:
-            if not file_path.lower().endswith('.pdf'):
-                return False
-            with open(file_path, 'rb') as f:
-                return f.read(4) == b'%PDF'
-        except Exception:
-            return False
-
     def preview_selected_file(self):
         # No-op: file list UI removed
         pass
@@ -327,11 +358,20 @@ class AdvancedPDFMetadataRemover:
     def open_advanced_controls_window(self):
         self.advanced_controls_window = tk.Toplevel(self.root)
         self.advanced_controls_window.title("Advanced Metadata Controls")
-        self.advanced_controls_window.geometry("500x700")
+        self.advanced_controls_window.geometry("500x790")
         self.advanced_controls_window.protocol("WM_DELETE_WINDOW", self.close_advanced_controls_window)
-        self.center_window(self.advanced_controls_window, 500, 700)
+        self.center_window(self.advanced_controls_window, 500, 790)
+        perf_frame = ttk.LabelFrame(self.advanced_controls_window, text="Performance", padding=10)
+        perf_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        ttk.Label(perf_frame, text="Worker Processes:").pack(side=tk.LEFT)
+        workers_spinbox = ttk.Spinbox(perf_frame, from_=1, to=max(64, default_jobs()), textvariable=self.workers_var, width=10)
+        workers_spinbox.pack(side=tk.LEFT, padx=2)
+        Tooltip(workers_spinbox, "Number of files processed in parallel, each in its own process.")
         meta_frame = ttk.LabelFrame(self.advanced_controls_window, text="Metadata Control", padding=10)
         meta_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        strip_check = ttk.Checkbutton(meta_frame, text="Also strip page and image XMP and /PieceInfo", variable=self.strip_object_metadata_var)
+        strip_check.pack(anchor=tk.W, pady=(0, 4))
+        Tooltip(strip_check, "Document XMP always follows the rules below; this also removes metadata attached to individual pages, images and other objects.")
         all_metadata_fields = [
             ("Title", "/Title"),
             ("Author", "/Author"),
@@ -410,8 +450,8 @@ class AdvancedPDFMetadataRemover:
             self.custom_metadata.remove(field_tuple)
 
     def update_extra_metadata_fields(self):
-        if self.file_paths_to_process:
-            first_file = self.file_paths_to_process[0]
+        first_file = self.file_registry.first()
+        if first_file:
             try:
                 import pikepdf
                 with pikepdf.open(os.path.normpath(first_file).replace('\\', '/')) as pdf:
@@ -468,99 +508,267 @@ class AdvancedPDFMetadataRemover:
         window.geometry(f"{width}x{height}+{x}+{y}")
 
     def start_processing(self):
-        if not self.file_paths_to_process:
+        if not len(self.file_registry):
             messagebox.showwarning("No Files", "Please add files to process.", parent=self.root)
             return
-        self.log_message("Files to process:", "info")
-        for f in self.file_paths_to_process:
-            self.log_message(f"  {f.replace('\\', '/')}" , "info")
-        print("Files to process:")
-        for f in self.file_paths_to_process:
-            print(f.replace('\\', '/'))
+        # Snapshot on the main thread; the files were validated when they were added
+        pdf_files = list(self.file_registry)
+        if len(pdf_files) <= MAX_LISTED_FILES:
+            self.log_message("Files to process:", "info")
+            for f in pdf_files:
+                self.log_message(f"  {f.replace('\\', '/')}" , "info")
+        # Tk variables are read here, on the main thread; workers only get plain values
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except ValueError:
+            workers = default_jobs()
+        settings = {
+            'config': dict(self.config, backup=self.backup_var.get(), overwrite=self.overwrite_var.get(), strip_object_metadata=self.strip_object_metadata_var.get()),
+            'plan': MetadataPlan.from_vars(self.metadata_remove_vars, self.metadata_edit_vars, self.custom_metadata),
+            'compression': self.compression_level_var.get(),
+            'overwrite': self.overwrite_var.get(),
+            'output_dir': self.output_path_var.get(),
+            'workers': workers,
+        }
+        if settings['compression'] != "None" and settings['config'].get('compression_backend', 'pikepdf') == 'qpdf':
+            # Finding qpdf may download it, so do that off the Tk thread and start the run afterwards
+            self.start_btn.config(state=tk.DISABLED)
+            threading.Thread(target=self._resolve_qpdf, args=(pdf_files, settings), daemon=True).start()
+            return
+        self._begin_processing(pdf_files, settings)
+
+    def _resolve_qpdf(self, pdf_files, settings):
+        """Find qpdf, asking about a download at most once, then start the run on the Tk thread."""
+        try:
+            settings['config']['qpdf_path'] = self.processor.get_qpdf_path()
+        except Exception as e:
+            self.log_message(f"Could not set up QPDF, compression will be skipped: {e}", "warning")
+        self.run_on_ui(self._begin_processing, pdf_files, settings)
+
+    def _begin_processing(self, pdf_files, settings):
+        # Workers reuse the qpdf the front end resolved and never download it themselves
+        settings['config']['qpdf_download'] = False
+        settings['fingerprint'] = make_fingerprint(settings['plan'].operations, settings['compression'], settings['overwrite'], settings['output_dir'], settings['config']['strip_object_metadata'])
+        settings['resume'] = self.ask_resume(settings['fingerprint'])
         self.cancel_flag = False
         self.set_controls_state('disabled')
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
-        if self.progress_bar is not None:
-            self.progress_bar["value"] = 0
-        threading.Thread(target=self._process_files, daemon=True).start()
+        self.set_progress(0)
+        threading.Thread(target=self._process_files, args=(pdf_files, settings), daemon=True).start()
+
+    def ask_resume(self, fingerprint):
+        """Offer to skip the files a stopped or crashed run with the same settings already completed."""
+        previous_fingerprint, entries = read_journal(self.journal_file)
+        if not entries or previous_fingerprint != fingerprint:
+            return False
+        done = sum(1 for entry in entries.values() if entry['state'] == 'done')
+        if done == len(entries):
+            return False
+        return messagebox.askyesno(
+            "Resume Interrupted Run",
+            f"A previous run with these settings did not finish ({done} of {len(entries)} file(s) done).\n\n"
+            "Skip the files it already completed?",
+            parent=self.root
+        )
 
     def stop_processing(self):
         self.cancel_flag = True
+        # Queued files are dropped and in-flight workers are killed instead of finishing their file
+        if self.engine is not None:
+            self.engine.terminate()
         self.log_message("Processing stopped by user.", "warning")
 
-    def _process_files(self):
+    def output_path_for(self, pdf_path, overwrite, output_dir):
+        norm_pdf_path = os.path.normpath(pdf_path).replace('\\', '/')
+        if overwrite:
+            return norm_pdf_path
+        if output_dir:
+            if os.path.isdir(output_dir):
+                return os.path.join(output_dir, os.path.basename(norm_pdf_path))
+            return output_dir
+        base, ext = os.path.splitext(norm_pdf_path)
+        return f"{base}_clean{ext}"
+
+    def _process_files(self, pdf_files, settings):
+        events = multiprocessing.Queue()
+        stop_monitor = threading.Event()
+        monitor = None
+        finished = False
         try:
-            pdf_files = self.collect_pdf_files(self.file_paths_to_process)
-            self.total_files = len(pdf_files)
-            if self.total_files == 0:
+            if len(pdf_files) == 0:
                 self.log_message("No valid PDF files found.", "warning")
                 return
-            self.log_message(f"Found {self.total_files} PDF file(s) to process.", "info")
-            if self.progress_bar is not None:
-                self.progress_bar["maximum"] = self.total_files
-                self.progress_bar["value"] = 0
+            jobs = [(pdf_path, self.output_path_for(pdf_path, settings['overwrite'], settings['output_dir'])) for pdf_path in pdf_files]
+            self.journal = Journal(self.journal_file, settings['fingerprint'], resume=settings['resume'])
+            if settings['resume']:
+                # Killed workers leave at most a temp file; their outputs are redone
+                self._remove_partial_outputs(self.journal.interrupted(), settings['config'].get('backup_store'))
+                remaining = [job for job in jobs if not self.journal.is_done(*job)]
+                self.log_message(f"Resuming: skipping {len(jobs) - len(remaining)} file(s) completed by the interrupted run.", "info")
+                jobs = remaining
+            for pdf_path, output_path in jobs:
+                self.journal.record('queued', pdf_path, output_path)
+            self.total_files = len(jobs)
+            if self.total_files == 0:
+                finished = True
+                self.log_message("All files were already processed.", "info")
+                return
+            workers = min(settings['workers'], self.total_files)
+            self.log_message(f"Found {self.total_files} PDF file(s) to process with {workers} worker(s).", "info")
+            self.set_progress(0, self.total_files)
+            self.in_flight = {}
+            monitor = threading.Thread(target=self._monitor_workers, args=(events, stop_monitor), daemon=True)
+            monitor.start()
+            # Even a single worker runs in its own process so Stop can kill it mid-file
+            self.engine = BatchEngine(
+                _process_job,
+                jobs=workers,
+                initializer=_init_worker,
+                initargs=(settings['config'], settings['plan'], settings['compression'], events),
+                isolate=True,
+                path_of=lambda job: job[0]
+            )
             success_count = 0
             error_count = 0
             compression_increase_count = 0
-            for i, pdf_path in enumerate(pdf_files):
+            done = 0
+            for (pdf_path, output_path), outcome, error in self.engine.run(jobs):
                 if self.cancel_flag:
                     break
-                self.current_file_index = i + 1
-                self.update_status(f"Processing {self.current_file_index}/{self.total_files}: {os.path.basename(pdf_path)}")
-                self.log_message(f"Processing: {pdf_path.replace('\\', '/')}" , "info")
-                # Compute output_path as in the original logic
-                norm_pdf_path = os.path.normpath(pdf_path).replace('\\', '/')
-                if self.overwrite_var.get():
-                    output_path = norm_pdf_path
-                elif self.output_path_var.get():
-                    if os.path.isdir(self.output_path_var.get()):
-                        filename = os.path.basename(norm_pdf_path)
-                        output_path = os.path.join(self.output_path_var.get(), filename)
-                    else:
-                        output_path = self.output_path_var.get()
-                else:
-                    base, ext = os.path.splitext(norm_pdf_path)
-                    output_path = f"{base}_clean{ext}"
-                result = self.processor.process_single_file(
-                    pdf_path,
-                    output_path,
-                    self.metadata_remove_vars,
-                    self.metadata_edit_vars,
-                    self.custom_metadata,
-                    self.compression_level_var.get()
-                )
-                if result is True:
-                    success_count += 1
-                elif result == "compression_increase":
+                result = outcome[0] if error is None else False
+                if error is not None:
+                    self.log_message(f"Worker failed on {pdf_path.replace('\\', '/')}: {error}", "error")
+                if result is True or result == "compression_increase":
                     success_count += 1
-                    compression_increase_count += 1
+                    if result == "compression_increase":
+                        compression_increase_count += 1
+                    try:
+                        self.journal.record('done', pdf_path, output_path, os.path.getsize(output_path))
+                    except OSError:
+                        self.journal.record('failed', pdf_path, output_path)
                 else:
                     error_count += 1
-                if self.progress_bar is not None:
-                    self.progress_bar["value"] = i + 1
-                if self.root is not None:
-                    self.root.update_idletasks()
+                    self.journal.record('failed', pdf_path, output_path)
+                done += 1
+                self.current_file_index = done
+                self.set_progress(done)
             if self.cancel_flag:
                 self.log_message("Processing cancelled by user.", "warning")
             else:
+                finished = True
                 summary = (f"Processing complete. Success: {success_count}, Errors: {error_count}, "
-                           f"Files with increased size after compression: {compression_increase_count}")
+                           f"Files where compression did not help: {compression_increase_count}")
                 self.log_message(summary, "info")
-                messagebox.showinfo("Summary", summary, parent=self.root)
+                self.run_on_ui(messagebox.showinfo, "Summary", summary, parent=self.root)
         except Exception as e:
             self.log_message(f"Processing error: {str(e)}", "error")
         finally:
-            if self.start_btn is not None:
-                self.start_btn.config(state=tk.NORMAL)
-            if self.stop_btn is not None:
-                self.stop_btn.config(state=tk.DISABLED)
-            self.set_controls_state('normal')
-            self.update_status("Ready")
+            if self.engine is not None:
+                self.engine.terminate()
+                self.engine = None
+            if monitor is not None:
+                # Killed workers can leave the queue locked or holding half a message, so never wait on it unbounded
+                stop_monitor.set()
+                monitor.join(MONITOR_JOIN_SECONDS)
+                if monitor.is_alive():
+                    self.log_message("Worker status updates stopped responding after the workers were stopped.", "warning")
+            events.cancel_join_thread()
+            events.close()
+            if self.cancel_flag:
+                self._remove_partial_outputs(backup_store=settings['config'].get('backup_store'))
+            self._close_journal(finished)
+            self.run_on_ui(self._finish_processing)
+
+    def _close_journal(self, finished):
+        """Flush the journal; a finished run has nothing to resume, so its journal is deleted."""
+        journal, self.journal = self.journal, None
+        if journal is None:
+            return
+        try:
+            journal.close()
+            if finished:
+                os.remove(self.journal_file)
+        except OSError as e:
+            self.log_message(f"Could not update the resume journal: {e}", "warning")
+
+    def _monitor_workers(self, events, stop):
+        """Turn worker events into log lines and a status bar with per-worker files and throughput.
+
+        Runs until stop is set and the queue has been drained.
+        """
+        slots = {}  # Worker pid -> display number
+        done_files = 0
+        done_bytes = 0
+        start = time.perf_counter()
+        while True:
+            try:
+                event = events.get(timeout=MONITOR_POLL_SECONDS)
+            except queue.Empty:
+                if stop.is_set():
+                    break
+                continue
+            except Exception:
+                # A worker killed mid-message can leave the queue unreadable
+                break
+            kind, pid = event[0], event[1]
+            if kind == 'log':
+                self.log_message(event[3], event[2])
+                continue
+            pdf_path, output_path = event[2], event[3]
+            slots.setdefault(pid, len(slots) + 1)
+            if kind == 'start':
+                self.in_flight[pid] = (pdf_path, output_path)
+                if self.journal is not None:
+                    self.journal.record('in_progress', pdf_path, output_path)
+                self.log_message(f"Processing: {pdf_path.replace('\\', '/')}", "info")
+            elif kind == 'done':
+                self.in_flight.pop(pid, None)
+                done_files += 1
+                try:
+                    done_bytes += os.path.getsize(pdf_path)
+                except OSError:
+                    pass
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            current = " | ".join(f"W{slots[p]}: {os.path.basename(i)}" for p, (i, _) in sorted(self.in_flight.items(), key=lambda x: slots[x[0]]))
+            self.update_status(f"{done_files}/{self.total_files} done, {done_files / elapsed:.1f} files/s, "
+                               f"{done_bytes / 1e6 / elapsed:.1f} MB/s" + (f" | {current}" if current else ""))
+
+    def _remove_partial_outputs(self, jobs=None, backup_store=None):
+        """Delete the temp files killed workers were writing; their outputs, originals and backups are untouched.
+
+        jobs defaults to the (input, output) pairs in flight. Sibling backups
+        are written next to the output, so their temp files are found with
+        it; backup_store is the root of a backup store to clean as well.
+        """
+        temp_paths = [temp_path for _, output_path in (jobs if jobs is not None else list(self.in_flight.values()))
+                      for temp_path in partial_outputs(output_path)]
+        if backup_store:
+            try:
+                temp_paths += BackupStore(backup_store).partial_objects()
+            except OSError as e:
+                self.log_message(f"Could not check the backup store for partial backups: {e}", "error")
+        for temp_path in temp_paths:
+            try:
+                os.remove(temp_path)
+                self.log_message(f"Removed partial output: {temp_path.replace('\\', '/')}", "warning")
+            except OSError as e:
+                self.log_message(f"Could not remove partial output {temp_path}: {e}", "error")
+        self.in_flight = {}
+
+    def _finish_processing(self):
+        if self.start_btn is not None:
+            self.start_btn.config(state=tk.NORMAL)
+        if self.stop_btn is not None:
+            self.stop_btn.config(state=tk.DISABLED)
+        self.set_controls_state('normal')
+        self.update_status("Ready")
 
     def on_closing(self):
         if hasattr(self, 'cancel_flag'):
             self.cancel_flag = True
+        if getattr(self, 'engine', None) is not None:
+            self.engine.terminate()
         self.save_config()
         if self.root is not None:
             self.root.destroy()
@@ -573,7 +781,9 @@ class AdvancedPDFMetadataRemover:
             'recursive': self.recursive_var.get() if self.recursive_var is not None else self.config.get('recursive', True),
             'show_errors': self.show_errors_var.get() if self.show_errors_var is not None else self.config.get('show_errors', False),
             'output_path': self.output_path_var.get() if self.output_path_var is not None else self.config.get('output_path', ''),
-            'max_depth': int(self.max_depth_var.get()) if self.max_depth_var is not None else int(self.config.get('max_depth', 3))
+            'max_depth': int(self.max_depth_var.get()) if self.max_depth_var is not None else int(self.config.get('max_depth', 3)),
+            'workers': int(self.workers_var.get()) if self.workers_var is not None else int(self.config.get('workers', default_jobs())),
+            'strip_object_metadata': self.strip_object_metadata_var.get() if self.strip_object_metadata_var is not None else self.config.get('strip_object_metadata', False)
         }
         save_config(self.config_file, config)
 
@@ -583,16 +793,90 @@ class AdvancedPDFMetadataRemover:
         self.root.mainloop()
 
     def log_message(self, message, level="info"):
-        if hasattr(self, 'log_box') and self.log_box is not None:
+        """Queue a log line; safe to call from any thread."""
+        self.ui_queue.put(('log', level.upper(), message))
+
+    def confirm(self, title, message):
+        """Yes/No dialog used by PDFProcessor for interactive prompts such as the QPDF download."""
+        return self.run_on_ui(messagebox.askyesno, title, message, parent=self.root, wait=True)
+
+    def update_status(self, message="Ready"):
+        """Queue a status bar update; only the latest one per tick is shown."""
+        self.ui_queue.put(('status', message))
+
+    def set_progress(self, value, maximum=None):
+        """Queue a progress bar update; only the latest one per tick is applied."""
+        self.ui_queue.put(('progress', value, maximum))
+
+    def run_on_ui(self, func, *args, wait=False, **kwargs):
+        """Run func on the Tk main thread. With wait=True, block until it returns and return its result."""
+        if threading.current_thread() is threading.main_thread():
+            return func(*args, **kwargs)
+        done = threading.Event() if wait else None
+        holder = {}
+        self.ui_queue.put(('call', func, args, kwargs, done, holder))
+        if done is not None:
+            done.wait()
+            return holder.get('result')
+        return None
+
+    def _drain_ui_queue(self):
+        """Apply queued UI events in one batch: a single log insert, the last status and progress."""
+        log_chunks = []
+        status = None
+        progress = None
+        try:
+            for _ in range(UI_MAX_EVENTS_PER_TICK):
+                try:
+                    event = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                kind = event[0]
+                if kind == 'log':
+                    _, tag, message = event
+                    log_chunks.extend((f"[{tag}] {message}\n", tag))
+                elif kind == 'status':
+                    status = event[1]
+                elif kind == 'progress':
+                    value, maximum = event[1], event[2]
+                    if progress is not None and maximum is None:
+                        maximum = progress[1]
+                    progress = (value, maximum)
+                elif kind == 'call':
+                    # Flush what came before so calls see earlier events applied
+                    self._apply_ui_updates(log_chunks, status, progress)
+                    log_chunks, status, progress = [], None, None
+                    _, func, args, kwargs, done, holder = event
+                    try:
+                        holder['result'] = func(*args, **kwargs)
+                    finally:
+                        if done is not None:
+                            done.set()
+            self._apply_ui_updates(log_chunks, status, progress)
+        finally:
+            if self.root is not None:
+                try:
+                    self.root.after(UI_POLL_MS, self._drain_ui_queue)
+                except tk.TclError:
+                    pass  # Window already destroyed
+
+    def _apply_ui_updates(self, log_chunks, status, progress):
+        if log_chunks and getattr(self, 'log_box', None) is not None:
             self.log_box.config(state=tk.NORMAL)
-            tag = level.upper()
-            self.log_box.insert(tk.END, f"[{tag}] {message}\n", tag)
+            self.log_box.insert(tk.END, *log_chunks)
+            # Keep only the most recent lines so inserts and scrolling stay cheap
+            line_count = int(self.log_box.index('end-1c').split('.')[0])
+            if line_count > MAX_LOG_LINES:
+                self.log_box.delete('1.0', f"{line_count - MAX_LOG_LINES + 1}.0")
             self.log_box.see(tk.END)
             self.log_box.config(state=tk.DISABLED)
-
-    def update_status(self, message="Ready"):
-        if hasattr(self, 'status_label') and self.status_label is not None:
-            self.status_label.config(text=message)
+        if status is not None and getattr(self, 'status_label', None) is not None:
+            self.status_label.config(text=status)
+        if progress is not None and self.progress_bar is not None:
+            value, maximum = progress
+            if maximum is not None:
+                self.progress_bar["maximum"] = maximum
+            self.progress_bar["value"] = value
 
     def clear_log(self) -> None:
         """Clear the log box."""
@@ -638,7 +922,7 @@ class AdvancedPDFMetadataRemover:
 
     def on_compression_level_change(self, event=None):
         level = self.compression_level_var.get()
-        if level != "None":
+        if level != "None" and self.config.get('compression_backend', 'pikepdf') == 'qpdf':
             self.check_qpdf_available()
 
     def check_qpdf_available(self):
@@ -650,7 +934,7 @@ class AdvancedPDFMetadataRemover:
 
     def update_file_count(self):
         if hasattr(self, 'file_count_label') and self.file_count_label is not None:
-            n = len(self.file_paths_to_process)
+            n = len(self.file_registry)
             self.file_count_label.config(text=f"{n} file{'s' if n != 1 else ''} ready for processing")
 
     def show_help(self):
@@ -676,14 +960,16 @@ class AdvancedPDFMetadataRemover:
             "   - Overwrite Original: Replace the original PDF.\n"
             "   - Recursive: Process PDFs in subfolders.\n"
             "   - Show Errors: Show error dialogs for failed files.\n"
-            "   - Compression Level: Compress output PDFs (requires QPDF).\n\n"
+            "   - Compression Level: Compress output PDFs while saving.\n\n"
             "4. Start Processing:\n"
             "   - Click 'Start Processing' to begin. Progress and status will be shown.\n"
-            "   - Click 'Stop' to cancel processing.\n\n"
+            "   - The status bar shows each worker's current file and the overall files/s and MB/s.\n"
+            "   - Click 'Stop' to cancel immediately; files still being written are discarded and their originals kept.\n\n"
             "5. Advanced Controls:\n"
             "   - Click 'Show Advanced Controls' to open advanced metadata options.\n"
             "   - Remove or edit standard/custom metadata fields.\n"
-            "   - Use 'Fill Random Data' or 'Reset' as needed.\n\n"
+            "   - Use 'Fill Random Data' or 'Reset' as needed.\n"
+            "   - 'Worker Processes' sets how many files are processed in parallel.\n\n"
             "6. Log:\n"
             "   - The log box shows info, warnings, and errors.\n"
             "   - Click 'Clear Log' to clear the log.\n\n"
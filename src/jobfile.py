@@ -0,0 +1,69 @@
+import json
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    from .plan import MetadataPlan
+except ImportError:
+    from plan import MetadataPlan
+
+COMPRESSION_LEVELS = ('None', 'Low', 'Medium', 'High', 'Maximum')
+JOB_KEYS = {'input', 'output', 'remove', 'set', 'compression'}
+
+
+def parse_job_line(line: str) -> Dict[str, Any]:
+    """Parse and validate one job-file line; raises ValueError with a readable message."""
+    try:
+        job = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e.msg})")
+    if not isinstance(job, dict):
+        raise ValueError("expected a JSON object")
+    unknown = set(job) - JOB_KEYS
+    if unknown:
+        raise ValueError(f"unknown key(s): {', '.join(sorted(unknown))}")
+    if not isinstance(job.get('input'), str) or not job['input']:
+        raise ValueError("'input' must be a non-empty string")
+    if job.get('output') is not None and not isinstance(job['output'], str):
+        raise ValueError("'output' must be a string")
+    remove = job.get('remove', [])
+    if isinstance(remove, str):
+        remove = [remove]
+    if not isinstance(remove, list):
+        raise ValueError("'remove' must be a list of field names")
+    set_fields = job.get('set', {})
+    if not isinstance(set_fields, dict):
+        raise ValueError("'set' must be an object mapping field names to values")
+    compression = job.get('compression')
+    if compression is not None and compression not in COMPRESSION_LEVELS:
+        raise ValueError(f"'compression' must be one of {', '.join(COMPRESSION_LEVELS)}")
+    has_rules = 'remove' in job or 'set' in job
+    return {
+        'input': job['input'],
+        'output': job.get('output'),
+        'plan': MetadataPlan.from_dict({'remove': remove, 'set': set_fields}) if has_rules else None,
+        'compression': compression
+    }
+
+
+def iter_job_file(path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (line_number, job, error) for each non-blank line of a JSONL job file ('-' reads stdin).
+
+    The file is read one line at a time, so jobs start while an upstream
+    producer is still writing it. A line that fails validation yields its
+    error instead of a job and does not stop the run. In a job, 'plan' is
+    None when the line gives neither 'remove' nor 'set', and 'output' and
+    'compression' are None when not given.
+    """
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, parse_job_line(line), None
+            except ValueError as e:
+                yield line_number, None, str(e)
+    finally:
+        if f is not sys.stdin:
+            f.close()
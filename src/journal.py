@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+JOURNAL_VERSION = 1
+SYNC_EVERY = 256  # Entries buffered before they are written and fsynced together
+SYNC_SECONDS = 1.0  # Longest time an entry stays buffered
+STATES = ('queued', 'in_progress', 'done', 'failed')
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+
+
+def _key(pdf_path: str, output_path: str) -> Tuple[str, str]:
+    return os.path.normcase(os.path.abspath(pdf_path)), os.path.normcase(os.path.abspath(output_path))
+
+
+def read_journal(path: str) -> Tuple[Optional[str], Dict[Tuple[str, str], Dict[str, Any]]]:
+    """Return (settings fingerprint, latest entry per (input, output)) from a journal file.
+
+    A missing file reads as (None, {}). Lines that cannot be parsed, such as
+    one torn by a crash mid-write, are ignored. A later queued/in_progress
+    entry does not hide a done one: start events can be journaled from
+    another thread after the result, and a done output is complete anyway.
+    """
+    fingerprint = None
+    entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(entry, dict):
+                    continue
+                if 'journal' in entry:
+                    fingerprint = entry.get('fingerprint')
+                elif entry.get('state') in STATES and 'input' in entry and 'output' in entry:
+                    key = _key(entry['input'], entry['output'])
+                    previous = entries.get(key)
+                    if previous is not None and previous['state'] == 'done' and entry['state'] in ('queued', 'in_progress'):
+                        continue
+                    entries[key] = entry
+    except OSError:
+        pass
+    return fingerprint, entries
+
+
+class Journal:
+    def __init__(self, path: str, fingerprint: Optional[str] = None, resume: bool = False) -> None:
+        """Append-only JSONL journal of each file's state: queued, in_progress, done or failed.
+
+        Entries are buffered and written with one fsync per SYNC_EVERY
+        entries or SYNC_SECONDS, whichever comes first. A crash can therefore
+        lose the last batch, which only means those files are redone: outputs
+        are written atomically, so redoing a file is always safe. With resume
+        the existing journal is loaded and extended; otherwise it is replaced.
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.previous_fingerprint = None
+        self.entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        if resume:
+            self.previous_fingerprint, self.entries = read_journal(path)
+        self._buffer: List[bytes] = []
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | _O_BINARY
+        if not resume:
+            flags |= os.O_TRUNC
+        self._fd = os.open(path, flags, 0o666)
+        if resume and self._ends_torn():
+            self._buffer.append(b'\n')  # Terminate a line torn by the crash so the next entry parses
+        if not resume or self.previous_fingerprint != fingerprint:
+            self._append({'journal': JOURNAL_VERSION, 'fingerprint': fingerprint, 'time': time.time()})
+
+    def _ends_torn(self) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except OSError:
+            return False
+
+    def is_done(self, pdf_path: str, output_path: str) -> bool:
+        """True if the loaded journal shows the file done and its output still has the recorded size."""
+        entry = self.entries.get(_key(pdf_path, output_path))
+        if entry is None or entry['state'] != 'done':
+            return False
+        try:
+            return os.path.getsize(output_path) == entry.get('size')
+        except OSError:
+            return False
+
+    def interrupted(self) -> List[Tuple[str, str]]:
+        """(input, output) pairs the loaded journal left queued or in progress."""
+        return [(e['input'], e['output']) for e in self.entries.values() if e['state'] in ('queued', 'in_progress')]
+
+    def done_count(self) -> int:
+        return sum(1 for e in self.entries.values() if e['state'] == 'done')
+
+    def record(self, state: str, pdf_path: str, output_path: str, size: Optional[int] = None) -> None:
+        """Record a state change; safe to call from several threads."""
+        entry = {'state': state, 'input': pdf_path, 'output': output_path}
+        if size is not None:
+            entry['size'] = size
+        self._append(entry)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._fd is None:
+                return
+            self._buffer.append((json.dumps(entry) + '\n').encode('utf-8'))
+            if len(self._buffer) >= SYNC_EVERY or time.monotonic() - self._last_sync >= SYNC_SECONDS:
+                self._sync()
+
+    def _sync(self) -> None:
+        if self._buffer:
+            os.write(self._fd, b''.join(self._buffer))
+            self._buffer.clear()
+            os.fsync(self._fd)
+        self._last_sync = time.monotonic()
+
+    def flush(self) -> None:
+        """Write and fsync all buffered entries."""
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is None:
+                return
+            try:
+                self._sync()
+            finally:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,170 @@
+import collections
+import contextlib
+import os
+import queue
+import threading
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional, Tuple
+
+try:
+    from .utils import commit_output, deferred_commits
+except ImportError:
+    from utils import commit_output, deferred_commits
+
+PREFETCH_DEPTH = 8  # Files read ahead of the one being processed
+WRITE_DEPTH = 4  # Processed files whose fsync and rename may still be pending
+READAHEAD_CHUNK = 1024 * 1024
+READAHEAD_LIMIT = 64 * 1024 * 1024  # Without posix_fadvise, only this much of each file is read ahead
+
+_DONE = object()
+
+
+def readahead(path: str) -> None:
+    """Ask the OS to start loading path into the page cache; never raises."""
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                # Asynchronous: the kernel (or the NFS client) schedules the reads and returns at once
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+            return
+        with open(path, 'rb', buffering=0) as f:
+            remaining = READAHEAD_LIMIT
+            while remaining > 0 and f.read(min(READAHEAD_CHUNK, remaining)):
+                remaining -= READAHEAD_CHUNK
+    except OSError:
+        pass
+
+
+def prefetch(items: Iterable[Any], path_of: Callable[[Any], str], depth: int = PREFETCH_DEPTH) -> Iterator[Any]:
+    """Yield items unchanged while a helper thread reads up to depth upcoming files ahead.
+
+    items is iterated on the consumer's thread, so it may be a generator that
+    is not thread-safe; only the paths are handed to the helper thread. The
+    lookahead buffer keeps at most depth items ahead of the one being consumed.
+    """
+    paths: queue.Queue = queue.Queue()
+
+    def reader() -> None:
+        for path in iter(paths.get, _DONE):
+            readahead(path)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    iterator = iter(items)
+    ahead: Deque[Any] = collections.deque()
+    exhausted = False
+    error: Optional[Exception] = None
+    try:
+        while True:
+            while not exhausted and len(ahead) <= depth:
+                try:
+                    item = next(iterator)
+                    path = path_of(item)
+                except StopIteration:
+                    exhausted = True
+                    break
+                except Exception as e:  # Surface scan errors once the files read so far were yielded
+                    exhausted, error = True, e
+                    break
+                paths.put(path)
+                ahead.append(item)
+            if not ahead:
+                if error is not None:
+                    raise error
+                return
+            yield ahead.popleft()
+    finally:
+        paths.put(_DONE)
+
+
+class Pipeline:
+    def __init__(self, func: Callable[[Any], Any], path_of: Optional[Callable[[Any], str]] = None, prefetch_depth: int = PREFETCH_DEPTH, write_depth: int = WRITE_DEPTH) -> None:
+        """Overlap reading, processing and writing of files in a single process.
+
+        A prefetch thread reads upcoming inputs ahead (when path_of maps an
+        item to its input path), func runs on the calling thread, and a writer
+        thread performs the fsync and rename of every atomic_output func made.
+        A file's result is yielded only after its outputs are committed.
+        """
+        self.func = func
+        self.path_of = path_of
+        self.prefetch_depth = prefetch_depth
+        self.write_depth = write_depth
+
+    def run(self, items: Iterable[Any]) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """Yield (item, result, error) tuples in input order, like BatchEngine.run."""
+        if self.path_of is not None:
+            items = prefetch(items, self.path_of, self.prefetch_depth)
+        to_write: queue.Queue = queue.Queue(maxsize=self.write_depth)
+        finished: queue.Queue = queue.Queue()
+        abort = threading.Event()
+        writer = threading.Thread(target=self._write, args=(to_write, finished, abort), daemon=True)
+        writer.start()
+        in_flight = 0
+        try:
+            for item in items:
+                pending = []
+                error = None
+                result = None
+                try:
+                    with deferred_commits(pending):
+                        result = self.func(item)
+                except Exception as e:
+                    error = e
+                # Blocks while the writer is write_depth files behind
+                to_write.put((item, result, error, pending))
+                in_flight += 1
+                while True:
+                    try:
+                        done = finished.get_nowait()
+                    except queue.Empty:
+                        break
+                    in_flight -= 1
+                    yield done
+            to_write.put(_DONE)
+            while in_flight:
+                in_flight -= 1
+                yield finished.get()
+        except BaseException as e:
+            abort.set()
+            # The writer keeps draining while aborted, so this cannot block for long
+            to_write.put(_DONE)
+            if isinstance(e, GeneratorExit):
+                raise
+            writer.join()
+            # Report the files committed before the interrupt; the aborted ones left no output
+            while True:
+                try:
+                    done = finished.get_nowait()
+                except queue.Empty:
+                    break
+                yield done
+            raise
+        finally:
+            writer.join()
+
+    @staticmethod
+    def _write(to_write: queue.Queue, finished: queue.Queue, abort: threading.Event) -> None:
+        while True:
+            entry = to_write.get()
+            if entry is _DONE:
+                return
+            item, result, error, pending = entry
+            discarded = False
+            for temp_path, path, mode_from in pending:
+                if abort.is_set() or error is not None:
+                    # Interrupted or failed: the temp file must not replace anything
+                    with contextlib.suppress(OSError):
+                        os.remove(temp_path)
+                    discarded = discarded or error is None
+                    continue
+                try:
+                    commit_output(temp_path, path, mode_from)
+                except OSError as e:
+                    error = e
+                    with contextlib.suppress(OSError):
+                        os.remove(temp_path)
+            if not discarded:
+                finished.put((item, None if error is not None else result, error))
@@ -0,0 +1,106 @@
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+
+def info_key(key: Any) -> str:
+    """Normalize a field name to an Info dictionary key ('Author' -> '/Author')."""
+    key = str(key).strip()
+    return key if key.startswith('/') else f"/{key}"
+
+
+class MetadataPlan:
+    """Frozen, picklable and hashable list of metadata operations.
+
+    Each operation is a (key, value) pair: value '' blanks the field, any
+    other value sets it. Fields without an operation are left untouched.
+    Build a plan once per run (from CLI arguments, Tk variables or a config
+    mapping) and apply it to every document.
+    """
+
+    __slots__ = ('operations', 'changes', '_hash')
+
+    def __init__(self, operations: Iterable[Tuple[str, str]] = ()) -> None:
+        # Later operations on the same key win, as they did when applied one after another
+        collapsed: Dict[str, str] = {}
+        for key, value in operations:
+            collapsed[info_key(key)] = str(value)
+        object.__setattr__(self, 'operations', tuple(collapsed.items()))
+        object.__setattr__(self, 'changes', MappingProxyType(collapsed))
+        object.__setattr__(self, '_hash', hash(self.operations))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("MetadataPlan is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("MetadataPlan is immutable")
+
+    def __reduce__(self) -> Tuple:
+        return MetadataPlan, (self.operations,)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, MetadataPlan) and self.operations == other.operations
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def __repr__(self) -> str:
+        return f"MetadataPlan({self.operations!r})"
+
+    def apply(self, docinfo: Any) -> Mapping[str, str]:
+        """Apply the operations to an Info dictionary and return them as a read-only key -> value mapping."""
+        for key, value in self.operations:
+            docinfo[key] = value
+        return self.changes
+
+    @classmethod
+    def from_args(cls, remove_meta: Optional[Iterable[str]] = None, edit_meta: Optional[Iterable[str]] = None, custom_meta: Optional[Iterable[str]] = None) -> 'MetadataPlan':
+        """Build a plan from --remove-meta keys and --edit-meta/--custom-meta KEY=VALUE pairs."""
+        operations: Dict[str, Optional[str]] = {info_key(key): '' for key in remove_meta or ()}
+        for pair in edit_meta or ():
+            if '=' in pair:
+                key, value = pair.split('=', 1)
+                # An empty value leaves the field untouched, even if it was also listed for removal
+                operations[info_key(key)] = value.strip() or None
+        for pair in custom_meta or ():
+            if '=' in pair and pair.split('=', 1)[1].strip():
+                key, value = pair.split('=', 1)
+                operations[info_key(key)] = value.strip()
+        return cls((key, value) for key, value in operations.items() if value is not None)
+
+    @classmethod
+    def from_vars(cls, remove_vars: Mapping[str, Any], edit_vars: Mapping[str, Any], custom_metadata: Iterable[Tuple[Any, str, Any]]) -> 'MetadataPlan':
+        """Build a plan from the GUI's Tk variables; call it on the thread that owns them."""
+        operations = []
+        for key, remove_var in remove_vars.items():
+            value = edit_vars[key].get().strip()
+            if value:
+                operations.append((key, value))
+            elif remove_var.get():
+                operations.append((key, ''))
+        for remove_var, key, value_var in custom_metadata:
+            value = value_var.get().strip()
+            if value:
+                operations.append((key, value))
+            elif remove_var.get():
+                operations.append((key, ''))
+        return cls(operations)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'MetadataPlan':
+        """Build a plan from {'remove': [keys], 'set': {key: value}}, as used in config and job files."""
+        remove = data.get('remove') or []
+        if isinstance(remove, str):
+            remove = [remove]
+        operations = [(key, '') for key in remove]
+        # As in the GUI, an empty value means "leave as is" rather than "blank"
+        operations += [(key, str(value)) for key, value in (data.get('set') or {}).items() if value is not None and str(value) != '']
+        return cls(operations)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'remove': [key for key, value in self.operations if not value],
+            'set': {key: value for key, value in self.operations if value}
+        }
@@ -1,32 +1,122 @@
+import contextlib
 import os
+import re
 import shutil
+import tempfile
 import time
 import pikepdf
-import subprocess
 import platform
-import urllib.request
-import zipfile
-import tkinter.messagebox as messagebox
-from typing import Any, Dict, Optional
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+try:
+    from .backup import COPY_CHUNK, BackupStore, copy_into, make_backup
+    from .compression import DEFAULT_FLATE_LEVEL, DEFAULT_MIN_GAIN, FLATE_LEVELS, apply_stream_policy, estimate_compression_gain
+    from .memory import current_rss, memory_plan, peak_rss, reset_peak_rss
+    from .plan import MetadataPlan
+    from .qpdf_backend import QPDFBackend
+    from .sanitize import strip_object_metadata, sync_xmp, xmp_needs_update
+    from .utils import atomic_output
+except ImportError:
+    from backup import COPY_CHUNK, BackupStore, copy_into, make_backup
+    from compression import DEFAULT_FLATE_LEVEL, DEFAULT_MIN_GAIN, FLATE_LEVELS, apply_stream_policy, estimate_compression_gain
+    from memory import current_rss, memory_plan, peak_rss, reset_peak_rss
+    from plan import MetadataPlan
+    from qpdf_backend import QPDFBackend
+    from sanitize import strip_object_metadata, sync_xmp, xmp_needs_update
+    from utils import atomic_output
+
+class ProcessResult:
+    """Outcome of one file from PDFProcessor.process_many.
+
+    status is 'success', 'compression_increase' or 'error', and error holds
+    the reason for a failure. job is the item as it was passed in, and
+    record is the file's process_single_file record (stage timings, byte
+    counts), or None if the worker failed before producing one.
+    """
+
+    __slots__ = ('job', 'status', 'error', 'record')
+
+    def __init__(self, job: Tuple, result: Any, error: Optional[str] = None, record: Optional[Dict[str, Any]] = None) -> None:
+        self.job = job
+        self.record = record
+        if result is True:
+            self.status = 'success'
+        elif result == "compression_increase":
+            self.status = 'compression_increase'
+        else:
+            self.status = 'error'
+        self.error = (error or "processing failed") if self.status == 'error' else None
+
+    @property
+    def input(self) -> str:
+        return self.job[0]
+
+    @property
+    def output(self) -> str:
+        return self.job[1]
+
+    @property
+    def ok(self) -> bool:
+        """True if an output was written, whether or not compression helped."""
+        return self.status != 'error'
+
+    @property
+    def result(self) -> Any:
+        """The same value process_single_file returns: True, False or "compression_increase"."""
+        return {'success': True, 'error': False}.get(self.status, self.status)
+
+    @property
+    def bytes_in(self) -> Optional[int]:
+        return self.record.get('bytes_in') if self.record else None
+
+    @property
+    def bytes_out(self) -> Optional[int]:
+        return self.record.get('bytes_out') if self.record else None
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.record.get('total') if self.record else None
+
+    def __repr__(self) -> str:
+        return f"ProcessResult({self.input!r}, {self.status!r}" + (f", error={self.error!r})" if self.error else ")")
+
 
 class PDFProcessor:
-    def __init__(self, config: Optional[Dict[str, Any]], log_callback=None, status_callback=None) -> None:
+    def __init__(self, config: Optional[Dict[str, Any]], log_callback=None, status_callback=None, profile_callback=None, confirm_callback=None) -> None:
         """PDFProcessor handles all PDF and metadata operations."""
         self.config = config or {}
         self.log_callback = log_callback  # function(message, level)
         self.status_callback = status_callback  # function(message)
+        self.confirm_callback = confirm_callback  # function(title, message) -> bool, supplied by interactive front ends
+        self.profile_callback = profile_callback  # function(record), called after every file
+        self.last_record = None  # Per-stage timings of the most recent process_single_file call
         self.qpdf_path = None
         self._qpdf_prompted = False  # Track if QPDF prompt has been shown
+        self.qpdf_backend = None
+        self._qpdf_backend_failed = False  # Resolve the qpdf binary at most once per processor
+        self.backup_store = None  # BackupStore for config['backup_store'], opened on first backup
 
     def log(self, message: str, level: str = "info") -> None:
         if self.log_callback:
             self.log_callback(message, level)
 
+    def fail(self, message: str, record: Optional[Dict[str, Any]] = None) -> bool:
+        """Log an error for the current file, keep it in its record (last_record by default) and return False."""
+        self.log(message, level="error")
+        record = record if record is not None else self.last_record
+        if record is not None:
+            record['error'] = message
+        return False
+
     def update_status(self, message: str) -> None:
         if self.status_callback:
             self.status_callback(message)
 
     def get_qpdf_path(self) -> Optional[str]:
+        # A front end that already resolved qpdf passes it to its workers
+        if self.config.get('qpdf_path'):
+            self.qpdf_path = self.config['qpdf_path']
+            return self.qpdf_path
         # First, check bin/qpdf.exe in the project root
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.abspath(os.path.join(script_dir, '..'))
@@ -43,28 +133,28 @@ class PDFProcessor:
         if which(qpdf_exe):
             self.qpdf_path = qpdf_exe
             return qpdf_exe
-        # If compression is requested and QPDF is missing, prompt the user (only once)
-        if not self._qpdf_prompted and hasattr(self, 'status_callback') and self.status_callback:
+        # If compression is requested and QPDF is missing, ask the front end (only once)
+        if not self._qpdf_prompted and self.confirm_callback:
             self._qpdf_prompted = True
             try:
-                # Only prompt if running in GUI
-                root = None
-                if hasattr(self.status_callback, '__self__'):
-                    root = getattr(self.status_callback.__self__, 'root', None)
-                if root:
-                    res = messagebox.askyesno(
-                        "QPDF Not Found",
-                        "QPDF is missing. If you want compression support, click Yes to download QPDF automatically.",
-                        parent=root
-                    )
-                    if not res:
-                        self.log("QPDF not downloaded. Compression will be skipped.", level="warning")
-                        return None
+                res = self.confirm_callback(
+                    "QPDF Not Found",
+                    "QPDF is missing. If you want compression support, click Yes to download QPDF automatically."
+                )
+                if not res:
+                    self.log("QPDF not downloaded. Compression will be skipped.", level="warning")
+                    return None
             except Exception:
                 pass
         elif self._qpdf_prompted:
             return None
+        if not self.config.get('qpdf_download', True):
+            # Worker processes never download; the front end asks once before starting them
+            self.log("QPDF not found. Compression will be skipped.", level="warning")
+            return None
         # Download QPDF if not found and user agreed
+        import urllib.request
+        import zipfile
         latest_version = '12.2.0'
         base_url = f'https://github.com/qpdf/qpdf/releases/download/v{latest_version}/'
         if platform.system() == 'Windows':
@@ -119,79 +209,430 @@ class PDFProcessor:
         self.qpdf_path = exe_path
         return exe_path
 
-    def process_single_file(self, pdf_path: str, output_path: str, metadata_remove_vars: Dict[str, Any], metadata_edit_vars: Dict[str, Any], custom_metadata: Any, compression_level: str) -> Any:
-        """Process a single PDF file: remove/edit metadata, save, and optionally compress."""
+    def apply_metadata(self, docinfo: Any, plan: MetadataPlan) -> Mapping[str, str]:
+        """Apply plan to a document info dictionary and return its changes (key -> new value, '' for removed)."""
+        return plan.apply(docinfo)
+
+    def sanitize(self, pdf: pikepdf.Pdf, plan: MetadataPlan) -> None:
+        """Apply plan to the Info dictionary and the XMP packet of an open document.
+
+        With config['strip_object_metadata'] the /Metadata and /PieceInfo of
+        pages, images and other objects are removed as well, so a single
+        open/save cycle leaves no metadata the plan did not allow.
+        """
+        changes = self.apply_metadata(pdf.docinfo, plan)
+        synced = sync_xmp(pdf, changes)
+        stripped = strip_object_metadata(pdf) if self.config.get('strip_object_metadata', False) else 0
+        if self.last_record is not None:
+            self.last_record['xmp_synced'] = synced
+            self.last_record['object_metadata_removed'] = stripped
+
+    def is_signed(self, pdf: Any) -> bool:
+        """Return True if the document carries digital signatures or certification permissions."""
+        try:
+            if '/Perms' in pdf.Root:
+                return True
+            acroform = pdf.Root.get('/AcroForm')
+            return acroform is not None and int(acroform.get('/SigFlags', 0)) & 1 == 1
+        except Exception:
+            return False
+
+    def find_startxref(self, pdf_path: str) -> Any:
+        """Return (offset, kind) of the last cross-reference section, kind being 'table' or 'stream'.
+
+        Returns None when the startxref pointer is missing or does not point at a
+        cross-reference section.
+        """
+        with open(pdf_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 1024))
+            tail = f.read()
+            matches = re.findall(rb'startxref\s+(\d+)\s+%%EOF', tail)
+            if not matches:
+                return None
+            offset = int(matches[-1])
+            if offset >= size:
+                return None
+            f.seek(offset)
+            head = f.read(64)
+        if head.startswith(b'xref'):
+            return offset, 'table'
+        if re.match(rb'\d+\s+\d+\s+obj', head):
+            return offset, 'stream'
+        return None
+
+    def build_incremental_update(self, pdf: Any, pdf_path: str, docinfo: Any) -> Any:
+        """Build the bytes of an incremental update that replaces the /Info dictionary.
+
+        Returns (update_bytes, None) on success or (None, reason) when the file
+        cannot safely be updated incrementally.
+        """
+        if pdf.is_encrypted:
+            return None, "document is encrypted"
+        if pdf.get_warnings():
+            return None, "cross-reference table is damaged"
+        startxref = self.find_startxref(pdf_path)
+        if startxref is None:
+            return None, "startxref does not point at a cross-reference section"
+        prev, kind = startxref
+        file_size = os.path.getsize(pdf_path)
+        with open(pdf_path, 'rb') as f:
+            f.seek(max(0, file_size - 1))
+            ends_with_newline = f.read(1) in (b'\n', b'\r')
+        trailer = pdf.trailer
+        info_num = int(trailer.Size)
+        root_num, root_gen = pdf.Root.objgen
+        trailer_entries = f"/Root {root_num} {root_gen} R /Info {info_num} 0 R /Prev {prev}".encode()
+        if '/ID' in trailer:
+            trailer_entries += b" /ID " + trailer.ID.unparse()
+
+        update = bytearray() if ends_with_newline else bytearray(b'\n')
+        info_offset = file_size + len(update)
+        update += f"{info_num} 0 obj\n".encode() + pikepdf.Dictionary(docinfo).unparse() + b"\nendobj\n"
+        xref_offset = file_size + len(update)
+        if kind == 'table':
+            update += f"xref\n{info_num} 1\n{info_offset:010d} 00000 n\r\n".encode()
+            update += f"trailer\n<< /Size {info_num + 1} ".encode() + trailer_entries + b" >>\n"
+        else:
+            # The previous section is a cross-reference stream, so continue with one
+            xref_num = info_num + 1
+            width = max(4, (xref_offset.bit_length() + 7) // 8)
+            rows = b"".join(b"\x01" + offset.to_bytes(width, 'big') + b"\x00" for offset in (info_offset, xref_offset))
+            update += (f"{xref_num} 0 obj\n<< /Type /XRef /Size {xref_num + 1} /Index [{info_num} 2] "
+                       f"/W [1 {width} 1] /Length {len(rows)} ").encode() + trailer_entries + b" >>\nstream\n"
+            update += rows + b"\nendstream\nendobj\n"
+        update += f"startxref\n{xref_offset}\n%%EOF\n".encode()
+        return bytes(update), None
+
+    def process_incremental(self, norm_pdf_path: str, output_path: str, plan: MetadataPlan) -> Any:
+        """Rewrite only the /Info dictionary by appending an incremental update.
+
+        Returns True on success, False on error, or None when the caller should
+        fall back to a full rewrite.
+        """
+        with pikepdf.open(norm_pdf_path) as pdf:
+            signed = self.is_signed(pdf)
+            docinfo = pikepdf.Dictionary(pdf.trailer.Info) if '/Info' in pdf.trailer else pikepdf.Dictionary()
+            changes = self.apply_metadata(docinfo, plan)
+            # The update only replaces /Info; anything else that must change needs a rewrite
+            if self.config.get('strip_object_metadata', False):
+                update, reason = None, "object-level metadata is stripped"
+            elif xmp_needs_update(pdf, changes):
+                update, reason = None, "the XMP metadata must change too"
+            else:
+                update, reason = self.build_incremental_update(pdf, norm_pdf_path, docinfo)
+        if update is None:
+            if signed and self.config.get('preserve_signatures', False):
+                # A full rewrite would invalidate the signatures the user asked to keep
+                return self.fail(f"Cannot update signed file incrementally ({reason}), skipping: {os.path.basename(norm_pdf_path)}")
+            self.log(f"Incremental update not possible ({reason}), rewriting {os.path.basename(norm_pdf_path)}", level="info")
+            return None
+        # In place too, the update goes to a copy that is renamed over the file, so a crash
+        # never leaves a half-written update; the original bytes are cloned where possible
+        with atomic_output(output_path, mode_from=norm_pdf_path) as f:
+            copy_into(norm_pdf_path, f.fileno())
+            f.seek(0, os.SEEK_END)
+            f.write(update)
+            if self.last_record is not None:
+                self.last_record['bytes_out'] = f.tell()
+        return True
+
+    def backup_file(self, pdf_path: str) -> str:
+        """Back up pdf_path and return the backup path.
+
+        Backups go to a unique .bak_<timestamp> file next to the original, or
+        into the content-addressed store at config['backup_store']. Copies use
+        a reflink clone or copy_file_range where the filesystem supports it.
+        """
+        store_root = self.config.get('backup_store')
+        if store_root and self.backup_store is None:
+            self.backup_store = BackupStore(store_root)
+        backup_path, method = make_backup(pdf_path, self.backup_store if store_root else None)
+        if self.last_record is not None:
+            self.last_record['backup_method'] = method
+        return backup_path
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Time a processing stage of the current file into last_record['stages']."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.last_record is not None:
+                stages = self.last_record['stages']
+                stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+    def process_single_file(self, pdf_path: str, output_path: str, plan: MetadataPlan, compression_level: str) -> Any:
+        """Process a single PDF file: remove/edit metadata, save, and optionally compress.
+
+        Stage timings, byte counts (bytes_in, bytes_metadata as measured for
+        the metadata-only output or None, bytes_out as written) and the peak RSS while processing the file
+        are kept in last_record and passed to profile_callback. config['profile_mode'] set to 'cprofile' or
+        'tracemalloc' additionally captures a function profile or the peak
+        Python allocation for the file.
+        """
+        record = {'input': pdf_path, 'output': output_path, 'stages': {}, 'bytes_in': None, 'bytes_metadata': None, 'bytes_out': None}
+        self.last_record = record
+        profile_mode = self.config.get('profile_mode')
+        profiler = None
+        if profile_mode == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif profile_mode == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start()
+        peak_resettable = reset_peak_rss()
+        rss_before = current_rss()
+        start = time.perf_counter()
+        try:
+            try:
+                record['bytes_in'] = os.path.getsize(pdf_path)
+            except OSError:
+                pass
+            result = self._process_single_file(pdf_path, output_path, plan, compression_level)
+        finally:
+            record['total'] = time.perf_counter() - start
+            record['peak_rss'] = peak_rss()
+            if peak_resettable and record['peak_rss'] is not None and rss_before is not None:
+                record['peak_rss_delta'] = max(0, record['peak_rss'] - rss_before)
+            if profiler is not None:
+                profiler.disable()
+                record['cprofile'] = self._profile_summary(profiler)
+            elif profile_mode == 'tracemalloc':
+                record['tracemalloc_peak'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        record['result'] = result if isinstance(result, str) else bool(result)
+        if result and record['bytes_out'] is None and os.path.exists(output_path):
+            record['bytes_out'] = os.path.getsize(output_path)
+        if result and record['bytes_metadata'] is None and 'compression' not in record:
+            record['bytes_metadata'] = record['bytes_out']  # Incremental update: the output is the metadata-only file
+        if self.profile_callback:
+            self.profile_callback(record)
+        return result
+
+    def process_many(self, pairs: Iterable[Tuple], plan: MetadataPlan, compression_level: str = "None", jobs: Optional[int] = 1, ordered: bool = False, max_pending: Optional[int] = None, isolate: bool = False) -> Iterator[ProcessResult]:
+        """Lazily process many files, yielding one ProcessResult per file.
+
+        pairs is any iterable of (input, output) pairs; it is consumed only as
+        workers free up, so it can be a generator over millions of files. An
+        item may also be (input, output, plan, compression_level) to override
+        the settings for that file (plan None keeps the given one); further
+        fields are passed through untouched in ProcessResult.job.
+
+        With jobs=1 the files are processed on this processor, with its
+        callbacks; otherwise on a pool of jobs worker processes (None for one
+        per CPU), or always in a separate process when isolate is set.
+        Results come in completion order, or in input order with ordered.
+        max_pending bounds the files handed to the pool and not yet yielded
+        (default four per worker). Closing the iterator early stops
+        submitting files and waits for those in progress.
+        """
+        try:
+            from .batch import BatchEngine, _init_worker, _process_job
+        except ImportError:
+            from batch import BatchEngine, _init_worker, _process_job
+        if jobs == 1 and not isolate:
+            def process(job: Tuple) -> Tuple[Any, Optional[Dict[str, Any]]]:
+                job_plan, level = (job[2] if job[2] is not None else plan, job[3]) if len(job) > 2 else (plan, compression_level)
+                return self.process_single_file(job[0], job[1], job_plan, level), self.last_record
+            engine = BatchEngine(process, jobs=1, path_of=itemgetter(0))
+        else:
+            engine = BatchEngine(_process_job, jobs=jobs, initializer=_init_worker, initargs=(self.config, plan, compression_level), max_pending=max_pending, isolate=isolate, path_of=itemgetter(0), ordered=ordered)
+        for job, outcome, error in engine.run(pairs):
+            if error is not None:
+                yield ProcessResult(job, False, f"Worker Error: {error or type(error).__name__}")
+                continue
+            result, record = outcome
+            yield ProcessResult(job, result, record.get('error') if record else None, record)
+
+    def _profile_summary(self, profiler: Any, limit: int = 15) -> List[Dict[str, Any]]:
+        import pstats
+        stats = pstats.Stats(profiler)
+        rows = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({'function': f"{os.path.basename(filename)}:{line}({func})", 'ncalls': ncalls, 'tottime': tottime, 'cumtime': cumtime})
+        rows.sort(key=lambda r: r['cumtime'], reverse=True)
+        return rows[:limit]
+
+    def _process_single_file(self, pdf_path: str, output_path: str, plan: MetadataPlan, compression_level: str) -> Any:
         try:
             norm_pdf_path = os.path.normpath(pdf_path).replace('\\', '/')
             # Backup logic
             if self.config.get('backup', False) and self.config.get('overwrite', False) and os.path.abspath(norm_pdf_path) == os.path.abspath(output_path):
-                base_backup = f"{norm_pdf_path}.bak_{int(time.time())}"
-                backup_path = base_backup
-                counter = 1
-                while os.path.exists(backup_path):
-                    backup_path = f"{base_backup}_{counter}"
-                    counter += 1
-                shutil.copy2(norm_pdf_path, backup_path)
-            # Open PDF
-            if os.path.abspath(norm_pdf_path) == os.path.abspath(output_path):
-                pdf = pikepdf.open(norm_pdf_path, allow_overwriting_input=True)
-            else:
-                pdf = pikepdf.open(norm_pdf_path)
-            with pdf:
-                for key, remove_var in metadata_remove_vars.items():
-                    edit_var = metadata_edit_vars[key]
-                    if remove_var.get():
-                        pdf.docinfo[key] = ""
-                    if edit_var.get().strip():
-                        pdf.docinfo[key] = edit_var.get().strip()
-                for remove_var, key, value_var in custom_metadata:
-                    if remove_var.get():
-                        pdf.docinfo[key] = ""
-                    if value_var.get().strip():
-                        pdf.docinfo[key] = value_var.get().strip()
-                pdf.save(output_path)
-            orig_size = os.path.getsize(norm_pdf_path)
-            compression_increased = False
-            if compression_level and compression_level != "None":
-                qpdf_path = self.get_qpdf_path()
-                if not qpdf_path:
-                    return False
-                compression_flag = self.get_compression_flag(compression_level)
-                try:
-                    # Suppress sandbox warnings for subprocess
-                    env = os.environ.copy()
-                    env['QPDF_DISABLE_SANDBOX'] = '1'  # Disable QPDF sandbox warnings
-                    
-                    result = subprocess.run([
-                        qpdf_path, *compression_flag, '--replace-input', output_path
-                    ], capture_output=True, text=True, env=env)
-                    if result.returncode != 0:
-                        raise RuntimeError(f"QPDF compression failed: {result.stderr.strip()}")
-                except Exception as e:
-                    self.log(f"QPDF Compression Error: {e}", level="error")
-                    return False
-                out_size = os.path.getsize(output_path)
-                if out_size > orig_size:
-                    self.log(f"Warning: Output file is larger after compression ({os.path.basename(output_path)}: {out_size} bytes > {orig_size} bytes)", level="warning")
-                    compression_increased = True
-            if compression_increased:
+                with self.stage('backup'):
+                    self.backup_file(norm_pdf_path)
+            compress = bool(compression_level and compression_level != "None")
+            incremental = self.config.get('incremental', False)
+            if memory_plan(os.path.getsize(norm_pdf_path), compress, self.config.get('memory_budget'), incremental) == 'defer':
+                self.log(f"{os.path.basename(norm_pdf_path)} is estimated to exceed the memory budget", level="warning")
+            # Incremental mode only appends a new /Info, so it cannot be combined with compression
+            if incremental and not compress:
+                with self.stage('incremental'):
+                    result = self.process_incremental(norm_pdf_path, output_path, plan)
+                if result is not None:
+                    return result
+            use_qpdf = compress and self.config.get('compression_backend', 'pikepdf') == 'qpdf'
+            # Open PDF; the input is memory-mapped and read lazily, even when it is also the output
+            with self.stage('open'):
+                pdf = pikepdf.open(norm_pdf_path, access_mode=pikepdf.AccessMode.mmap)
+            predicted_gain = None
+            decision = None
+            # Written to a temp file and renamed over output_path once synced; pdf is closed before the rename.
+            # qpdf needs the finished file, so that commit cannot be deferred to a writer stage.
+            with atomic_output(output_path, mode_from=norm_pdf_path, deferrable=not use_qpdf) as out, pdf:
+                with self.stage('metadata'):
+                    self.sanitize(pdf, plan)
+                if compress:
+                    with self.stage('estimate'):
+                        predicted_gain = estimate_compression_gain(pdf, compression_level)['predicted_gain']
+                    if predicted_gain < self.config.get('min_compression_gain', DEFAULT_MIN_GAIN):
+                        compress = use_qpdf = False
+                        decision = 'skipped'
+                with self.stage('save'):
+                    if compress and not use_qpdf:
+                        # The stream policy rewrites streams in memory, so the metadata-only version is saved first
+                        with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(output_path))) as metadata_only:
+                            pdf.save(metadata_only)
+                            metadata_size = metadata_only.tell()
+                            self.save_compressed(pdf, out, compression_level)
+                            decision = 'compressed'
+                            if out.tell() >= metadata_size:
+                                # Compression did not help: keep the metadata-only version instead
+                                out.seek(0)
+                                out.truncate()
+                                metadata_only.seek(0)
+                                shutil.copyfileobj(metadata_only, out, COPY_CHUNK)
+                                decision = 'reverted'
+                    else:
+                        pdf.save(out)
+                        metadata_size = out.tell()
+                    out_size = out.tell()
+            if self.last_record is not None:
+                # The output may still be an uncommitted temp file, so its size is taken from the writer
+                if not use_qpdf:
+                    self.last_record['bytes_out'] = out_size
+                self.last_record['bytes_metadata'] = metadata_size
+            if use_qpdf:
+                backend = self.get_qpdf_backend()
+                if not backend:
+                    return self.fail("QPDF Compression Error: qpdf is not available")
+                with self.stage('compress'):
+                    result = backend.compress(output_path, self.get_compression_flag(compression_level))
+                if not result.ok:
+                    return self.fail(f"QPDF Compression Error: QPDF compression failed: {result.stderr}")
+                decision = 'compressed' if result.kept else 'reverted'
+            if decision is not None:
+                self.report_compression(output_path, decision, metadata_size, predicted_gain, out_size=None if use_qpdf else out_size)
+            if decision == 'reverted':
                 return "compression_increase"
             return True
         except Exception as e:
-            self.log(f"Processing Error: {e}", level="error")
-            return False
+            return self.fail(f"Processing Error: {e}")
 
-    def get_compression_flag(self, level: str) -> Any:
-        if level == "Low":
-            return ["--compression-level=1", "--stream-data=compress"]
-        elif level == "Medium":
-            return ["--compression-level=5", "--stream-data=compress"]
-        elif level == "High":
-            return ["--compression-level=7", "--stream-data=compress"]
-        elif level == "Maximum":
-            return ["--compression-level=9", "--stream-data=compress"]
+    def report_compression(self, output_path: str, decision: str, metadata_size: int, predicted_gain: Optional[float] = None, record: Optional[Dict[str, Any]] = None, out_size: Optional[int] = None) -> None:
+        """Log the compression decision for a file and store it in its record (last_record by default).
+
+        decision is 'compressed', 'skipped' (predicted gain below
+        config['min_compression_gain']) or 'reverted' (compression did not make
+        the file smaller, so the metadata-only output was kept). bytes_saved
+        is measured against metadata_size, the size of the metadata-only output.
+        """
+        name = os.path.basename(output_path)
+        bytes_saved = metadata_size - (out_size if out_size is not None else os.path.getsize(output_path))
+        predicted = f"predicted gain {predicted_gain:.1%}" if predicted_gain is not None else "no estimate"
+        if decision == 'compressed':
+            self.log(f"Compressed {name}: saved {bytes_saved} bytes ({predicted})", level="info")
+        elif decision == 'skipped':
+            self.log(f"Compression skipped for {name}: {predicted} is below the threshold", level="info")
         else:
+            self.log(f"Warning: Compression did not reduce {name} ({predicted}), kept the metadata-only output", level="warning")
+        record = record if record is not None else self.last_record
+        if record is not None:
+            record['compression'] = {'decision': decision, 'predicted_gain': predicted_gain, 'bytes_saved': bytes_saved}
+
+    def get_qpdf_backend(self) -> Optional[QPDFBackend]:
+        """Resolve and validate the qpdf binary once, returning the shared backend or None."""
+        if self.qpdf_backend is None and not self._qpdf_backend_failed:
+            qpdf_path = self.get_qpdf_path()
+            if qpdf_path:
+                try:
+                    self.qpdf_backend = QPDFBackend(qpdf_path, self.config.get('qpdf_workers'))
+                except RuntimeError as e:
+                    self.log(f"QPDF Error: {e}", level="error")
+            self._qpdf_backend_failed = self.qpdf_backend is None
+        return self.qpdf_backend
+
+    def compress_outputs(self, entries: List[Tuple[str, int]], compression_level: str, records: Optional[List[Dict[str, Any]]] = None) -> List[Any]:
+        """Compress already processed outputs as one qpdf batch.
+
+        entries holds (output_path, metadata_only_size) pairs. Returns one result per
+        entry, using the same values as process_single_file. If records (as
+        produced by process_single_file) are given, their compress stage and
+        output size are updated.
+        """
+        backend = self.get_qpdf_backend()
+        if not backend:
+            for record in records or ():
+                record['error'] = "QPDF Compression Error: qpdf is not available"
+            return [False] * len(entries)
+        flags = self.get_compression_flag(compression_level)
+        results = []
+        qpdf_results = backend.compress_batch([e[0] for e in entries], flags)
+        for i, ((output_path, metadata_size), qpdf_result) in enumerate(zip(entries, qpdf_results)):
+            if records is not None:
+                records[i]['stages']['compress'] = qpdf_result.duration
+                records[i]['total'] += qpdf_result.duration
+                if qpdf_result.ok:
+                    records[i]['bytes_out'] = os.path.getsize(output_path)
+            if not qpdf_result.ok:
+                results.append(self.fail(f"QPDF Compression Error: QPDF compression failed: {qpdf_result.stderr}", records[i] if records is not None else {}))
+                continue
+            decision = 'compressed' if qpdf_result.kept else 'reverted'
+            self.report_compression(output_path, decision, metadata_size, record=records[i] if records is not None else {})
+            results.append(True if qpdf_result.kept else "compression_increase")
+        return results
+
+    def save_compressed(self, pdf: pikepdf.Pdf, output: Any, level: str) -> Dict[str, int]:
+        """Apply the per-stream recompression policy to pdf and save it to output (path or binary file)."""
+        stats = apply_stream_policy(pdf, level)
+        if self.last_record is not None:
+            self.last_record['streams'] = stats
+        # The Flate level (used for object streams) is process-wide in pikepdf, so later saves must not inherit it
+        if level in FLATE_LEVELS:
+            pikepdf.settings.set_flate_compression_level(FLATE_LEVELS[level])
+        try:
+            pdf.save(output, **self.get_compression_options(level))
+        finally:
+            pikepdf.settings.set_flate_compression_level(DEFAULT_FLATE_LEVEL)
+        return stats
+
+    def get_compression_options(self, level: str) -> Dict[str, Any]:
+        """Return pikepdf save() options for a document already processed by apply_stream_policy.
+
+        Streams are copied as they are; config['object_streams'] additionally
+        packs small objects into compressed object streams.
+        """
+        if level not in FLATE_LEVELS:
+            return {}
+        options = {
+            'compress_streams': False,
+            'stream_decode_level': pikepdf.StreamDecodeLevel.none,
+        }
+        if self.config.get('object_streams', False):
+            options['object_stream_mode'] = pikepdf.ObjectStreamMode.generate
+        return options
+
+    def get_compression_flag(self, level: str) -> Any:
+        """qpdf flags for level: compress unfiltered streams and leave already filtered ones as they are."""
+        if level not in FLATE_LEVELS:
             return []
+        flags = [f"--compression-level={FLATE_LEVELS[level]}", "--compress-streams=y", "--decode-level=none"]
+        if self.config.get('object_streams', False):
+            flags.append("--object-streams=generate")
+        return flags
 
     # ... (move all PDF processing, metadata, compression, and QPDF logic here)
     pass 
\ No newline at end of file
@@ -0,0 +1,122 @@
+import contextlib
+import os
+import subprocess
+import time
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+_running: Set[subprocess.Popen] = set()  # qpdf processes started by this process and not yet reaped
+
+
+def kill_running() -> None:
+    """Kill every qpdf process this process started, e.g. before a terminated worker exits."""
+    for proc in list(_running):
+        with contextlib.suppress(OSError):
+            proc.kill()
+
+
+class QPDFResult:
+    __slots__ = ('path', 'returncode', 'stderr', 'duration', 'kept')
+
+    def __init__(self, path: str, returncode: int, stderr: str, duration: float = 0.0, kept: bool = False) -> None:
+        self.path = path
+        self.returncode = returncode
+        self.stderr = stderr
+        self.duration = duration
+        self.kept = kept  # False when the compressed copy was not smaller and the input was left as is
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class QPDFBackend:
+    def __init__(self, qpdf_path: str, max_workers: Optional[int] = None) -> None:
+        """Drive an already resolved qpdf binary over one or many files.
+
+        The binary is validated and the subprocess environment is built once,
+        so per-file cost is only the qpdf process itself.
+        """
+        self.qpdf_path = qpdf_path
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.env = os.environ.copy()
+        self.env['QPDF_DISABLE_SANDBOX'] = '1'  # Disable QPDF sandbox warnings
+        self.version = self._validate()
+
+    def _validate(self) -> str:
+        try:
+            result = subprocess.run([self.qpdf_path, '--version'], capture_output=True, text=True, env=self.env, timeout=30)
+        except (OSError, subprocess.SubprocessError) as e:
+            raise RuntimeError(f"QPDF binary is not usable ({self.qpdf_path}): {e}")
+        if result.returncode != 0:
+            raise RuntimeError(f"QPDF binary is not usable ({self.qpdf_path}): {result.stderr.strip()}")
+        return result.stdout.splitlines()[0].strip() if result.stdout else ''
+
+    @staticmethod
+    def _temp_path(path: str) -> str:
+        directory, name = os.path.split(path)
+        return os.path.join(directory, f".{name}.qpdf.tmp")
+
+    def _command(self, path: str, flags: List[str]) -> List[str]:
+        return [self.qpdf_path, *flags, path, self._temp_path(path)]
+
+    def _finish(self, path: str, returncode: int, stderr: str, started: float) -> QPDFResult:
+        """Replace path with qpdf's output only if that is smaller, and drop the temp file otherwise."""
+        temp_path = self._temp_path(path)
+        kept = False
+        try:
+            if returncode == 0 and os.path.getsize(temp_path) < os.path.getsize(path):
+                os.replace(temp_path, path)
+                kept = True
+        except OSError as e:
+            stderr = stderr or str(e)
+            returncode = returncode or -1
+        if not kept and os.path.exists(temp_path):
+            os.remove(temp_path)
+        return QPDFResult(path, returncode, stderr, time.perf_counter() - started, kept)
+
+    def _start(self, path: str, flags: List[str]) -> subprocess.Popen:
+        proc = subprocess.Popen(self._command(path, flags), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=self.env)
+        _running.add(proc)
+        return proc
+
+    @staticmethod
+    def _wait(proc: subprocess.Popen) -> str:
+        try:
+            _, stderr = proc.communicate()
+        finally:
+            _running.discard(proc)
+        return (stderr or '').strip()
+
+    def compress(self, path: str, flags: List[str]) -> QPDFResult:
+        """Compress a single file in place, keeping the original bytes if compression does not make it smaller."""
+        start = time.perf_counter()
+        proc = self._start(path, flags)
+        stderr = self._wait(proc)
+        return self._finish(path, proc.returncode, stderr, start)
+
+    def compress_batch(self, paths: Iterable[str], flags: List[str]) -> List[QPDFResult]:
+        """Compress many files like compress(), keeping up to max_workers qpdf processes running.
+
+        qpdf handles one input per invocation, so a batch is a set of
+        concurrently running processes sharing the resolved binary and
+        environment. Results are returned in input order.
+        """
+        paths = list(paths)
+        results: List[Any] = [None] * len(paths)
+        running: List[Tuple[int, subprocess.Popen, float]] = []
+        index = 0
+        while index < len(paths) or running:
+            while index < len(paths) and len(running) < self.max_workers:
+                try:
+                    started = time.perf_counter()
+                    running.append((index, self._start(paths[index], flags), started))
+                except OSError as e:
+                    results[index] = QPDFResult(paths[index], -1, str(e))
+                index += 1
+            if running:
+                # Wait for the oldest process; the rest keep running meanwhile
+                i, proc, started = running.pop(0)
+                stderr = self._wait(proc)
+                # Upper bound for processes that finished while an older one was awaited
+                results[i] = self._finish(paths[i], proc.returncode, stderr, started)
+        return results
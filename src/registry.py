@@ -0,0 +1,66 @@
+import os
+from typing import Dict, Iterable, Iterator, Tuple
+
+
+class FileRegistry:
+    def __init__(self) -> None:
+        """Insertion-ordered set of queued PDF files with O(1) membership checks.
+
+        Paths are keyed by their normalized absolute form, so the same file
+        added twice through different spellings is only queued once.
+        Validation results are cached per file and reused while size and
+        mtime are unchanged.
+        """
+        self._files: Dict[str, str] = {}
+        self._validity: Dict[str, Tuple[int, int, bool]] = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def add(self, path: str) -> bool:
+        """Queue path; returns False if it was already queued."""
+        key = self._key(path)
+        if key in self._files:
+            return False
+        self._files[key] = path
+        return True
+
+    def add_many(self, paths: Iterable[str]) -> list:
+        """Queue several paths and return the ones that were newly added."""
+        return [path for path in paths if self.add(path)]
+
+    def clear(self) -> None:
+        self._files.clear()
+
+    def __contains__(self, path: str) -> bool:
+        return self._key(path) in self._files
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._files.values()))
+
+    def first(self):
+        return next(iter(self._files.values()), None)
+
+    def is_valid_pdf(self, file_path: str) -> bool:
+        """Return True if file_path has a .pdf name and starts with the %PDF signature (cached)."""
+        if not file_path.lower().endswith('.pdf'):
+            return False
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        key = self._key(file_path)
+        cached = self._validity.get(key)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        try:
+            with open(file_path, 'rb') as f:
+                valid = f.read(4) == b'%PDF'
+        except OSError:
+            valid = False
+        self._validity[key] = (st.st_size, st.st_mtime_ns, valid)
+        return valid
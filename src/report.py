@@ -0,0 +1,87 @@
+import json
+import math
+import sys
+import time
+from array import array
+from typing import Any, Dict, Optional, TextIO
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: Any, pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted sequence, or None if it is empty."""
+    if not len(sorted_values):
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class ResultReport:
+    def __init__(self, stream: TextIO, close_stream: bool = False) -> None:
+        """Stream one JSON line per file to stream, then an aggregate line on close().
+
+        File lines have "type": "file" and carry the input and output paths,
+        status ('success', 'compression_increase', 'error' or 'skipped'),
+        error, bytes_before, bytes_after_metadata (null unless the
+        metadata-only output was measured), bytes_after_compression (null
+        when the file was not compressed) and duration in seconds. The
+        final "type": "summary" line has the counts, files/s, MB/s and
+        p50/p95/p99 latency of the processed files.
+        """
+        self.stream = stream
+        self.close_stream = close_stream
+        self.start = time.perf_counter()
+        self.counts = {'success': 0, 'compression_increase': 0, 'error': 0, 'skipped': 0}
+        self.bytes_before = 0
+        self.durations = array('d')  # 8 bytes per file, so millions of files stay cheap
+
+    @classmethod
+    def open(cls, path: str) -> 'ResultReport':
+        """Open a report on path, or on stdout for '-'."""
+        if path == '-':
+            return cls(sys.stdout)
+        return cls(open(path, 'w', encoding='utf-8'), close_stream=True)
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        # Flushed per line so consumers see each file as soon as it completes
+        self.stream.write(json.dumps(entry) + '\n')
+        self.stream.flush()
+
+    def add(self, pdf_path: Optional[str], output_path: Optional[str], status: str, error: Optional[str] = None, record: Optional[Dict[str, Any]] = None) -> None:
+        """Report one file; record is its process_single_file record, if the file got that far."""
+        record = record or {}
+        compressed = record.get('compression', {}).get('decision') == 'compressed'
+        duration = record.get('total')
+        self.counts[status] = self.counts.get(status, 0) + 1
+        if status != 'skipped':
+            self.bytes_before += record.get('bytes_in') or 0
+            if duration is not None:
+                self.durations.append(duration)
+        self._write({
+            'type': 'file',
+            'input': pdf_path,
+            'output': output_path,
+            'status': status,
+            'error': error,
+            'bytes_before': record.get('bytes_in'),
+            'bytes_after_metadata': record.get('bytes_metadata'),
+            'bytes_after_compression': record.get('bytes_out') if compressed else None,
+            'duration': round(duration, 6) if duration is not None else None
+        })
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        processed = self.counts['success'] + self.counts['compression_increase'] + self.counts['error']
+        durations = sorted(self.durations)
+        entry = {'type': 'summary', 'files': sum(self.counts.values()), **self.counts, 'elapsed': round(elapsed, 6),
+                 'files_per_s': round(processed / elapsed, 3), 'mb_per_s': round(self.bytes_before / 1e6 / elapsed, 3)}
+        for pct in PERCENTILES:
+            value = percentile(durations, pct)
+            entry[f'latency_p{pct}'] = round(value, 6) if value is not None else None
+        return entry
+
+    def close(self) -> None:
+        """Write the aggregate line and close the stream (stdout is left open)."""
+        self._write(self.summary())
+        if self.close_stream:
+            self.stream.close()
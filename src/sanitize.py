@@ -0,0 +1,51 @@
+from typing import Dict
+
+import pikepdf
+from pikepdf.models.metadata import DOCINFO_MAPPING
+
+# Info dictionary key -> XMP property in Clark notation ({namespace}name), e.g. /Author -> dc:creator
+XMP_PROPERTIES = {str(name): f"{{{ns}}}{key}" for ns, key, name, _ in DOCINFO_MAPPING}
+OBJECT_METADATA_KEYS = ('/Metadata', '/PieceInfo')
+
+
+def xmp_needs_update(pdf: pikepdf.Pdf, changes: Dict[str, str]) -> bool:
+    """True if the catalog has an XMP packet and changes touch a field that XMP mirrors."""
+    return '/Metadata' in pdf.Root and any(key in XMP_PROPERTIES for key in changes)
+
+
+def sync_xmp(pdf: pikepdf.Pdf, changes: Dict[str, str]) -> bool:
+    """Apply Info dictionary changes (key -> new value, '' for removed) to the catalog's XMP packet.
+
+    Removed fields are deleted from XMP and set fields are written through
+    pikepdf's DocumentInfo mapping (dc:creator, dc:title, pdf:Producer, ...).
+    The packet is only parsed when a mirrored field changes, and no new
+    packet is created for files without one. Returns True if it was rewritten.
+    """
+    if not xmp_needs_update(pdf, changes):
+        return False
+    with pdf.open_metadata(set_pikepdf_as_editor=False, update_docinfo=False) as meta:
+        for key, value in changes.items():
+            prop = XMP_PROPERTIES.get(key)
+            if prop is not None and not value and prop in meta:
+                del meta[prop]
+        meta.load_from_docinfo({key: value for key, value in changes.items() if value and key in XMP_PROPERTIES})
+    return True
+
+
+def strip_object_metadata(pdf: pikepdf.Pdf) -> int:
+    """Remove /Metadata and /PieceInfo from every object except the catalog's document XMP.
+
+    One pass over the object table covers pages, images, form XObjects and
+    fonts alike; the detached streams are then no longer written on save.
+    Returns the number of entries removed.
+    """
+    root = pdf.Root.objgen
+    removed = 0
+    for obj in pdf.objects:
+        if not isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream)):
+            continue
+        for key in OBJECT_METADATA_KEYS:
+            if key in obj and not (key == '/Metadata' and obj.objgen == root):
+                del obj[key]
+                removed += 1
+    return removed
@@ -0,0 +1,63 @@
+import os
+from typing import Callable, Iterable, Iterator, Optional
+
+
+def is_pdf_name(path: str) -> bool:
+    return path.lower().endswith('.pdf')
+
+
+def iter_pdf_files(paths: Iterable[str], recursive: bool = True, max_depth: int = 0, is_valid: Optional[Callable[[str], bool]] = None) -> Iterator[str]:
+    """Yield PDF files under the given files/folders as they are found.
+
+    Folders are walked with os.scandir in sorted order, so output is
+    deterministic. Files directly inside a folder are at depth 0; without
+    recursive only that level is scanned, otherwise subfolders deeper than
+    max_depth are pruned (max_depth <= 0 means unlimited). Symlinked folders
+    are followed, but each real folder is visited once, so symlink loops
+    terminate. is_valid is an optional extra filter applied to every
+    candidate.
+    """
+    limit = max_depth if recursive and max_depth > 0 else (None if recursive else 0)
+    seen_files = set()
+    visited_dirs = set()
+
+    def accept(file_path: str) -> bool:
+        key = os.path.normcase(os.path.abspath(file_path))
+        if key in seen_files or (is_valid is not None and not is_valid(file_path)):
+            return False
+        seen_files.add(key)
+        return True
+
+    for path in paths:
+        if os.path.isfile(path):
+            if is_pdf_name(path) and accept(path):
+                yield path
+        elif os.path.isdir(path):
+            # Depth-first stack of (directory, depth); children are pushed in reverse to pop in sorted order
+            stack = [(path, 0)]
+            while stack:
+                directory, depth = stack.pop()
+                try:
+                    st = os.stat(directory)
+                except OSError:
+                    continue
+                if (st.st_dev, st.st_ino) in visited_dirs:
+                    continue
+                visited_dirs.add((st.st_dev, st.st_ino))
+                try:
+                    with os.scandir(directory) as it:
+                        entries = sorted(it, key=lambda e: e.name)
+                except OSError:
+                    continue
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if limit is None or depth < limit:
+                                subdirs.append(entry.path)
+                        elif entry.is_file() and is_pdf_name(entry.name) and accept(entry.path):
+                            yield entry.path
+                    except OSError:
+                        continue
+                for subdir in reversed(subdirs):
+                    stack.append((subdir, depth + 1))
@@ -1,8 +1,15 @@
+import contextlib
+import glob
 import random
+import shutil
 import string
 import json
 import os
-from typing import Any, Dict
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+_deferred = threading.local()
 
 def random_string(length):
     return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
@@ -25,4 +32,75 @@ def save_config(config_file: str, config: Dict[str, Any]) -> None:
         with open(config_file, 'w') as f:
             json.dump(config, f, indent=2)
     except Exception as e:
-        print(f"Failed to save config: {e}") 
\ No newline at end of file
+        print(f"Failed to save config: {e}") 
+
+def _temp_prefix(path: str) -> str:
+    return f".{os.path.basename(path)}."
+
+def fsync_directory(directory: str) -> None:
+    """Persist a rename in directory (no-op where directories cannot be opened, e.g. Windows)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def commit_output(temp_path: str, path: str, mode_from: Optional[str] = None, synced: bool = False) -> None:
+    """fsync temp_path (unless already synced), copy permissions, rename it over path and persist the rename."""
+    if not synced:
+        with open(temp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+    if mode_from is not None:
+        shutil.copymode(mode_from, temp_path)
+    os.replace(temp_path, path)
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+@contextlib.contextmanager
+def deferred_commits(pending: List):
+    """Make atomic_output on this thread hand its commits to the caller instead of doing them.
+
+    Each (temp_path, path, mode_from) appended to pending must be finished
+    with commit_output (or the temp file removed); this lets a writer stage
+    do the fsync and rename while the next file is being processed.
+    """
+    previous = getattr(_deferred, 'pending', None)
+    _deferred.pending = pending
+    try:
+        yield pending
+    finally:
+        _deferred.pending = previous
+
+@contextlib.contextmanager
+def atomic_output(path: str, mode_from: Optional[str] = None, deferrable: bool = True):
+    """Yield a binary file that replaces path only after it was completely written and fsynced.
+
+    The data goes to a hidden temp file in path's directory, which is renamed
+    over path with os.replace, so readers and crashes only ever see the old
+    or the new file. mode_from copies permission bits from another file.
+    Inside deferred_commits the commit is queued instead, unless deferrable
+    is False because the caller needs the finished file right away.
+    """
+    pending = getattr(_deferred, 'pending', None) if deferrable else None
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=_temp_prefix(path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+            f.flush()
+            if pending is None:
+                os.fsync(f.fileno())
+        if pending is not None:
+            pending.append((temp_path, path, mode_from))
+            return
+        commit_output(temp_path, path, mode_from, synced=True)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+
+def partial_outputs(path: str) -> List[str]:
+    """Temp files left behind by atomic_output(path) when its process was killed."""
+    directory = os.path.dirname(os.path.abspath(path))
+    return glob.glob(os.path.join(glob.escape(directory), glob.escape(_temp_prefix(path)) + '*.tmp'))